@@ -1,7 +1,25 @@
 ﻿# activity_tracker.py
 import streamlit as st
+from collections import deque
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, Deque, Optional
+
+# Number of recent activities kept in session state
+MAX_RECENT_ACTIVITIES = 10
+
+# Relative-time units for format_activity_time, largest first
+TIME_UNITS = ((86400, 'day'), (3600, 'hour'), (60, 'minute'))
+
+# Activity type -> (title, icon)
+ACTIVITY_META = {
+    'template_request': ('Document Generated', '📄'),
+    'overtime_request': ('Overtime Request', '⏰'),
+    'employee_request': ('Time Off Request', '🏖️'),
+    'expense_report': ('Expense Report', '💰'),
+    'manager_approval': ('Approval Given', '✅'),
+    'manager_overtime_approval': ('Overtime Approval', '⏰✅'),
+    'reimbursement_request': ('Reimbursement Request', '💳')
+}
 
 def log_activity(activity_type: str, details: Dict[str, Any] = None, summary: str = None):
     """
@@ -13,45 +31,23 @@ def log_activity(activity_type: str, details: Dict[str, Any] = None, summary: st
         summary: Human-readable summary of what was done
     """
     if 'recent_activities' not in st.session_state:
-        st.session_state.recent_activities = []
-    
-    # Activity type mapping
-    activity_titles = {
-        'template_request': 'Document Generated',
-        'overtime_request': 'Overtime Request',
-        'employee_request': 'Time Off Request',
-        'expense_report': 'Expense Report',
-        'manager_approval': 'Approval Given',
-        'manager_overtime_approval': 'Overtime Approval',
-        'reimbursement_request': 'Reimbursement Request'
-    }
-    
-    # Activity icons
-    activity_icons = {
-        'template_request': '📄',
-        'overtime_request': '⏰',
-        'employee_request': '🏖️',
-        'expense_report': '💰',
-        'manager_approval': '✅',
-        'manager_overtime_approval': '⏰✅',
-        'reimbursement_request': '💳'
-    }
+        st.session_state.recent_activities = deque(maxlen=MAX_RECENT_ACTIVITIES)
     
+    now = datetime.now()
+    meta = ACTIVITY_META.get(activity_type)
+    title, icon = meta or ('Unknown Activity', '📋')
     activity = {
         'type': activity_type,
-        'title': activity_titles.get(activity_type, 'Unknown Activity'),
-        'icon': activity_icons.get(activity_type, '📋'),
-        'summary': summary or f"{activity_titles.get(activity_type, 'Activity')} completed successfully",
-        'timestamp': datetime.now().isoformat(),
+        'title': title,
+        'icon': icon,
+        'summary': summary or f"{meta[0] if meta else 'Activity'} completed successfully",
+        'timestamp': now.isoformat(),
+        '_dt': now,  # Parsed timestamp kept for display so renders never re-parse
         'details': details or {}
     }
     
-    # Add to the beginning of the list (most recent first)
-    st.session_state.recent_activities.insert(0, activity)
-    
-    # Keep only the last 10 activities
-    if len(st.session_state.recent_activities) > 10:
-        st.session_state.recent_activities = st.session_state.recent_activities[:10]
+    # Add to the front (most recent first); the deque drops the oldest past its maxlen
+    st.session_state.recent_activities.appendleft(activity)
     
     # Also update the legacy session state for backward compatibility
     st.session_state.last_completed_flow = activity_type
@@ -64,50 +60,55 @@ def log_activity(activity_type: str, details: Dict[str, Any] = None, summary: st
     # Mark activities as updated so UI can refresh after main render
     st.session_state['activities_dirty'] = True
 
-def get_recent_activities() -> List[Dict[str, Any]]:
+def get_recent_activities() -> Deque[Dict[str, Any]]:
     """
-    Get the list of recent activities
+    Get the recent activities, most recent first
     
     Returns:
-        List of recent activities
+        Deque of recent activities
     """
-    return st.session_state.get('recent_activities', [])
+    return st.session_state.get('recent_activities', deque())
 
 def clear_activities():
     """Clear all recent activities"""
-    st.session_state.recent_activities = []
+    st.session_state.recent_activities = deque(maxlen=MAX_RECENT_ACTIVITIES)
     if 'last_completed_flow' in st.session_state:
         del st.session_state.last_completed_flow
     if 'last_completed_meta' in st.session_state:
         del st.session_state.last_completed_meta
 
-def format_activity_time(timestamp: str) -> str:
+def format_activity_time(activity: Dict[str, Any], now: Optional[datetime] = None) -> str:
     """
     Format activity timestamp for display
     
     Args:
-        timestamp: ISO format timestamp string
+        activity: Activity dict as built by log_activity
+        now: Reference time, computed once per render by the caller
         
     Returns:
         Human-readable time string
     """
-    try:
-        dt = datetime.fromisoformat(timestamp)
-        now = datetime.now()
-        diff = now - dt
-        
-        if diff.days > 0:
-            return f"{diff.days} day{'s' if diff.days != 1 else ''} ago"
-        elif diff.seconds > 3600:
-            hours = diff.seconds // 3600
-            return f"{hours} hour{'s' if hours != 1 else ''} ago"
-        elif diff.seconds > 60:
-            minutes = diff.seconds // 60
-            return f"{minutes} minute{'s' if minutes != 1 else ''} ago"
-        else:
-            return "Just now"
-    except:
-        return "Recently"
+    dt = activity.get('_dt')
+    if dt is None:
+        # Activities logged before '_dt' existed only carry the ISO string
+        timestamp = activity.get('timestamp', '')
+        if not timestamp or timestamp.count('T') != 1:
+            return "Recently"
+        try:
+            dt = datetime.fromisoformat(timestamp)
+        except ValueError:
+            return "Recently"
+        if dt.tzinfo is not None:
+            # Can't be compared with the naive 'now'
+            return "Recently"
+    
+    elapsed = int(((now or datetime.now()) - dt).total_seconds())
+    
+    for unit_seconds, unit in TIME_UNITS:
+        if elapsed >= unit_seconds:
+            count = elapsed // unit_seconds
+            return f"{count} {unit}{'s' if count != 1 else ''} ago"
+    return "Just now"
 
 # Activity tracking decorators and helpers
 def track_template_generation(template_type: str, details: Dict[str, Any] = None):
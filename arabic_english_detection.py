@@ -5,14 +5,109 @@ This module handles all bilingual (Arabic/English) detection logic
 """
 
 import re
+from functools import lru_cache
 from datetime import datetime, timedelta
 from typing import Tuple, Optional, Dict, Any
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
+
+# Collapse Arabic spelling variants (hamza forms, taa marbuta, alif maqsura)
+# and strip diacritics, so keyword tables only need one spelling per word
+_ARABIC_NORMALIZATION = str.maketrans({
+    'إ': 'ا', 'أ': 'ا', 'آ': 'ا',
+    'ة': 'ه', 'ى': 'ي', 'ؤ': 'و', 'ئ': 'ي',
+    **{chr(c): None for c in range(0x064B, 0x0653)},  # tanween, harakat, shadda, sukun
+})
+
+# Single C-level probe for any Arabic-block codepoint
+_ARABIC_CHAR_RE = re.compile(r'[\u0600-\u06FF]')
+
+def contains_arabic(text: str) -> bool:
+    """True if text has any Arabic-block character (pure-ASCII text skips the scan)"""
+    return not text.isascii() and _ARABIC_CHAR_RE.search(text) is not None
+
+@lru_cache(maxsize=512)
+def normalize_query(query: str) -> str:
+    """
+    Lowercase English and normalize Arabic spelling in one pass per query.
+    Memoized so every detector run on the same chat message shares one pass.
+    """
+    query_lower = query.lower()
+    if contains_arabic(query_lower):
+        return query_lower.translate(_ARABIC_NORMALIZATION)
+    return query_lower
+
+def _keyword_regex(keywords) -> re.Pattern:
+    """Compile a keyword list into one alternation regex for a single-pass substring scan"""
+    normalized = dict.fromkeys(k.translate(_ARABIC_NORMALIZATION) for k in keywords)
+    return re.compile('|'.join(map(re.escape, normalized)))
+
+def _bilingual_regex(keywords: Dict[str, list]) -> re.Pattern:
+    """
+    Compile an {'english': [...], 'arabic': [...]} table into one matcher.
+    Arabic has no letter case, so both languages can be scanned in a single
+    pass over the normalized query.
+    """
+    return _keyword_regex([*keywords['english'], *keywords['arabic']])
 
 # ============================================
 # TIME OFF DETECTION
 # ============================================
 
+# Non-request patterns (questions about balance, history, etc.)
+NON_REQUEST_PATTERNS = [
+    # English
+    r'how many days', r'how much (?:leave|time off|vacation)',
+    r'check my (?:leave|balance|time off)', r'(?:leave|vacation|time off) balance',
+    r'days (?:remaining|left|available)', r'did i take', r'have i taken',
+    r'days i took', r'time off history', r'leave history',
+    # Arabic
+    r'كم يوم', r'كم (?:إجازة|اجازة|عطلة)', r'رصيد (?:إجازة|اجازة|إجازات|اجازات)',
+    r'أيام (?:متبقية|متبقيه|باقية|باقيه)', r'هل أخذت', r'تاريخ (?:الإجازات|الاجازات)',
+]
+
+# Expand time-off intent patterns
+TIME_OFF_PATTERNS = [
+    # English
+    r'request time off', r'take time off', r'need time off', r'book time off',
+    r'request leave', r'take leave', r'i want a vacation', r'i need a vacation',
+    r'i want a break', r'i need a break', r'going on vacation', r'plan to take',
+    r'i want time off', r'can i take', r'may i take', r'i would like to take',
+    r'apply for leave', r'leave application', r'leave request', r'leave of absence',
+    r'absent from work', r'personal day', r'holiday request', r'vacation request',
+    # Arabic
+    r'إجازة', r'اجازة', r'عطلة', r'راحة', r'أريد إجازة', r'أحتاج إجازة', r'أريد أن آخذ إجازة',
+    r'أريد أن آخذ يوم إجازة', r'أحتاج يوم إجازة', r'أريد يوم عطلة', r'أرغب في إجازة',
+    r'أرغب في عطلة', r'أريد أن أطلب إجازة', r'أريد أن أطلب عطلة', r'أريد إجازة سنوية',
+    r'أريد إجازة مرضية', r'أريد إجازة بدون راتب', r'أحتاج إجازة سنوية', r'أحتاج إجازة مرضية',
+    r'أحتاج إجازة بدون راتب', r'أرغب في إجازة سنوية', r'أرغب في إجازة مرضية', r'أرغب في إجازة بدون راتب',
+    r'أريد أن أأخذ إجازة', r'أريد أن أأخذ عطلة', r'أحتاج إلى إجازة', r'أحتاج إلى عطلة',
+]
+
+# Compiled once at import so each query runs a single search per category;
+# the guard patterns use non-capturing groups since only a hit matters
+_NON_REQUEST_RE = re.compile('|'.join(NON_REQUEST_PATTERNS).translate(_ARABIC_NORMALIZATION))
+_TIME_OFF_RE = re.compile('|'.join(TIME_OFF_PATTERNS).translate(_ARABIC_NORMALIZATION))
+
+VACATION_WORDS = {
+    'english': ['vacation', 'holiday', 'leave', 'off', 'away', 'pto', 'break'],
+    'arabic': ['إجازة', 'اجازة', 'عطلة', 'راحة', 'استراحة']
+}
+
+TEMPORAL_WORDS = {
+    'english': ['tomorrow', 'next', 'this', 'from', 'to', 'between', 'on', 'starting'],
+    'arabic': ['غدا', 'غداً', 'بكرة', 'القادم', 'القادمة', 'من', 'إلى', 'الى', 'بين', 'يوم', 'أيام', 'يوماً', 'الأسبوع', 'الشهر']
+}
+
+# Fuzzy matching only makes sense against patterns in a script the query
+# actually contains, so split them once and probe the query's charset first
+_FUZZY_PATTERNS_EN = [p.lower() for p in TIME_OFF_PATTERNS if p.isascii()]
+_FUZZY_PATTERNS_AR = [p.translate(_ARABIC_NORMALIZATION) for p in TIME_OFF_PATTERNS if not p.isascii()]
+_LATIN_CHAR_RE = re.compile(r'[a-z]')
+
+_VACATION_RE = _bilingual_regex(VACATION_WORDS)
+_TEMPORAL_RE = _bilingual_regex(TEMPORAL_WORDS)
+
+@lru_cache(maxsize=512)
 def detect_time_off_intent_multilingual(query: str) -> Tuple[bool, float]:
     """
     Detect if the user is trying to request time off in Arabic or English
@@ -23,66 +118,29 @@ def detect_time_off_intent_multilingual(query: str) -> Tuple[bool, float]:
     Returns:
         Tuple (is_time_off_request: bool, confidence: float)
     """
-    query_lower = query.lower()
-    
-    # Non-request patterns (questions about balance, history, etc.)
-    non_request_patterns = [
-        # English
-        r'how many days', r'how much (leave|time off|vacation)',
-        r'check my (leave|balance|time off)', r'(leave|vacation|time off) balance',
-        r'days (remaining|left|available)', r'did i take', r'have i taken',
-        r'days i took', r'time off history', r'leave history',
-        # Arabic
-        r'كم يوم', r'كم (إجازة|اجازة|عطلة)', r'رصيد (إجازة|اجازة|إجازات|اجازات)',
-        r'أيام (متبقية|متبقيه|باقية|باقيه)', r'هل أخذت', r'تاريخ (الإجازات|الاجازات)',
-    ]
+    query_norm = normalize_query(query)
     
-    if any(re.search(pattern, query_lower) for pattern in non_request_patterns):
+    if _NON_REQUEST_RE.search(query_norm):
         return False, 0.0
     
-    # Expand time-off intent patterns
-    TIME_OFF_PATTERNS = [
-        # English
-        r'request time off', r'take time off', r'need time off', r'book time off',
-        r'request leave', r'take leave', r'i want a vacation', r'i need a vacation',
-        r'i want a break', r'i need a break', r'going on vacation', r'plan to take',
-        r'i want time off', r'can i take', r'may i take', r'i would like to take',
-        r'apply for leave', r'leave application', r'leave request', r'leave of absence',
-        r'absent from work', r'personal day', r'holiday request', r'vacation request',
-        # Arabic
-        r'إجازة', r'اجازة', r'عطلة', r'راحة', r'أريد إجازة', r'أحتاج إجازة', r'أريد أن آخذ إجازة',
-        r'أريد أن آخذ يوم إجازة', r'أحتاج يوم إجازة', r'أريد يوم عطلة', r'أرغب في إجازة',
-        r'أرغب في عطلة', r'أريد أن أطلب إجازة', r'أريد أن أطلب عطلة', r'أريد إجازة سنوية',
-        r'أريد إجازة مرضية', r'أريد إجازة بدون راتب', r'أحتاج إجازة سنوية', r'أحتاج إجازة مرضية',
-        r'أحتاج إجازة بدون راتب', r'أرغب في إجازة سنوية', r'أرغب في إجازة مرضية', r'أرغب في إجازة بدون راتب',
-        r'أريد أن أأخذ إجازة', r'أريد أن أأخذ عطلة', r'أحتاج إلى إجازة', r'أحتاج إلى عطلة',
-    ]
-    
-    if any(re.search(pattern, query_lower) for pattern in TIME_OFF_PATTERNS):
+    if _TIME_OFF_RE.search(query_norm):
         return True, 0.8
     
     # Fuzzy matching for time-off patterns
-    for pattern in TIME_OFF_PATTERNS:
-        score = fuzz.partial_ratio(pattern.lower(), query_lower)
-        if score >= 80:
-            return True, 0.7
-    
-    # Keyword-based detection
-    vacation_words = {
-        'english': ['vacation', 'holiday', 'leave', 'off', 'away', 'pto', 'break'],
-        'arabic': ['إجازة', 'اجازة', 'عطلة', 'راحة', 'استراحة']
-    }
+    fuzzy_patterns = []
+    if _LATIN_CHAR_RE.search(query_norm):
+        fuzzy_patterns += _FUZZY_PATTERNS_EN
+    if contains_arabic(query_norm):
+        fuzzy_patterns += _FUZZY_PATTERNS_AR
     
-    temporal_words = {
-        'english': ['tomorrow', 'next', 'this', 'from', 'to', 'between', 'on', 'starting'],
-        'arabic': ['غدا', 'غداً', 'بكرة', 'القادم', 'القادمة', 'من', 'إلى', 'الى', 'بين', 'يوم', 'أيام', 'يوماً', 'الأسبوع', 'الشهر']
-    }
+    if fuzzy_patterns and process.extractOne(
+        query_norm, fuzzy_patterns, scorer=fuzz.partial_ratio, score_cutoff=80
+    ):
+        return True, 0.7
     
-    has_vacation = any(word in query_lower for word in vacation_words['english']) or \
-                   any(word in query for word in vacation_words['arabic'])
-                   
-    has_temporal = any(word in query_lower for word in temporal_words['english']) or \
-                   any(word in query for word in temporal_words['arabic'])
+    # Keyword-based detection
+    has_vacation = bool(_VACATION_RE.search(query_norm))
+    has_temporal = bool(_TEMPORAL_RE.search(query_norm))
     
     if has_vacation and has_temporal:
         return True, 0.6  # Moderate confidence for fallback
@@ -93,74 +151,86 @@ def detect_time_off_intent_multilingual(query: str) -> Tuple[bool, float]:
 # OVERTIME DETECTION
 # ============================================
 
+OVERTIME_KEYWORDS = {
+    'english': [
+        'overtime', 'over time', 'extra hours', 'work extra',
+        'work late', 'additional hours', 'extra work',
+        'ot request', 'request overtime', 'book overtime'
+    ],
+    'arabic': [
+        'إضافي', 'اضافي', 'عمل إضافي', 'عمل اضافي',
+        'وقت إضافي', 'وقت اضافي', 'دوام إضافي', 'دوام اضافي',
+        'ساعات إضافية', 'ساعات اضافية', 'شغل إضافي', 'شغل اضافي',
+        'أوفر تايم', 'اوفر تايم', 'أوفرتايم', 'اوفرتايم'
+    ]
+}
+
+_OVERTIME_RE = _bilingual_regex(OVERTIME_KEYWORDS)
+
+@lru_cache(maxsize=512)
 def detect_overtime_intent_multilingual(query: str) -> bool:
     """Detect if the user is trying to request overtime in Arabic or English"""
-    query_lower = query.lower()
-    
-    overtime_keywords = {
-        'english': [
-            'overtime', 'over time', 'extra hours', 'work extra',
-            'work late', 'additional hours', 'extra work',
-            'ot request', 'request overtime', 'book overtime'
-        ],
-        'arabic': [
-            'إضافي', 'اضافي', 'عمل إضافي', 'عمل اضافي',
-            'وقت إضافي', 'وقت اضافي', 'دوام إضافي', 'دوام اضافي',
-            'ساعات إضافية', 'ساعات اضافية', 'شغل إضافي', 'شغل اضافي',
-            'أوفر تايم', 'اوفر تايم', 'أوفرتايم', 'اوفرتايم'
-        ]
-    }
+    query_norm = normalize_query(query)
     
-    return any(keyword in query_lower for keyword in overtime_keywords['english']) or \
-           any(keyword in query for keyword in overtime_keywords['arabic'])
+    return bool(_OVERTIME_RE.search(query_norm))
 
 # ============================================
 # TEMPLATE DETECTION
 # ============================================
 
+ARABIC_LANGUAGE_KEYWORDS = ['عربي', 'عربية', 'بالعربي', 'بالعربية', 'العربية']
+ARABIC_EMPLOYMENT_KEYWORDS = ['عمل', 'توظيف', 'وظيفة']
+
+EMBASSY_KEYWORDS = {
+    'english': ['embassy', 'visa', 'travel', 'consulate'],
+    'arabic': ['سفارة', 'سفاره', 'قنصلية', 'قنصليه', 'فيزا', 'تأشيرة', 'تاشيرة']
+}
+
+EXPERIENCE_KEYWORDS = {
+    'english': ['experience', 'service', 'former', 'past'],
+    'arabic': ['خبرة', 'خبره', 'شهادة خبرة', 'شهادة خبره']
+}
+
+EMPLOYMENT_KEYWORDS = {
+    'english': ['employment letter', 'work certificate', 'employment certificate'],
+    'arabic': ['خطاب عمل', 'شهادة عمل', 'رسالة عمل', 'خطاب توظيف']
+}
+
+TEMPLATE_KEYWORDS = {
+    'english': ['template', 'document', 'certificate', 'letter'],
+    'arabic': ['خطاب', 'شهادة', 'شهاده', 'نموذج', 'وثيقة', 'وثيقه', 'رسالة', 'رساله', 'مستند']
+}
+
+_ARABIC_LANGUAGE_RE = _keyword_regex(ARABIC_LANGUAGE_KEYWORDS)
+_ARABIC_EMPLOYMENT_RE = _keyword_regex(ARABIC_EMPLOYMENT_KEYWORDS)
+_EMBASSY_RE = _bilingual_regex(EMBASSY_KEYWORDS)
+_EXPERIENCE_RE = _bilingual_regex(EXPERIENCE_KEYWORDS)
+_EMPLOYMENT_RE = _bilingual_regex(EMPLOYMENT_KEYWORDS)
+_TEMPLATE_RE = _bilingual_regex(TEMPLATE_KEYWORDS)
+
+@lru_cache(maxsize=512)
 def detect_template_intent_multilingual(query: str) -> Optional[str]:
     """Detect if user is asking for a template in Arabic or English"""
-    query_lower = query.lower()
+    query_norm = normalize_query(query)
     
     # Arabic letter detection
-    if any(keyword in query for keyword in ['عربي', 'عربية', 'بالعربي', 'بالعربية', 'العربية']):
-        if any(keyword in query for keyword in ['عمل', 'توظيف', 'وظيفة']):
-            return 'employment_letter_arabic'
+    if _ARABIC_LANGUAGE_RE.search(query_norm) and _ARABIC_EMPLOYMENT_RE.search(query_norm):
+        return 'employment_letter_arabic'
     
     # Embassy/visa letter
-    embassy_keywords = {
-        'english': ['embassy', 'visa', 'travel', 'consulate'],
-        'arabic': ['سفارة', 'سفاره', 'قنصلية', 'قنصليه', 'فيزا', 'تأشيرة', 'تاشيرة']
-    }
-    if any(keyword in query_lower for keyword in embassy_keywords['english']) or \
-       any(keyword in query for keyword in embassy_keywords['arabic']):
+    if _EMBASSY_RE.search(query_norm):
         return 'employment_letter_embassy'
     
     # Experience letter
-    experience_keywords = {
-        'english': ['experience', 'service', 'former', 'past'],
-        'arabic': ['خبرة', 'خبره', 'شهادة خبرة', 'شهادة خبره']
-    }
-    if any(keyword in query_lower for keyword in experience_keywords['english']) or \
-       any(keyword in query for keyword in experience_keywords['arabic']):
+    if _EXPERIENCE_RE.search(query_norm):
         return 'experience_letter'
     
     # Employment letter
-    employment_keywords = {
-        'english': ['employment letter', 'work certificate', 'employment certificate'],
-        'arabic': ['خطاب عمل', 'شهادة عمل', 'رسالة عمل', 'خطاب توظيف']
-    }
-    if any(keyword in query_lower for keyword in employment_keywords['english']) or \
-       any(keyword in query for keyword in employment_keywords['arabic']):
+    if _EMPLOYMENT_RE.search(query_norm):
         return 'employment_letter'
     
     # General template request
-    template_keywords = {
-        'english': ['template', 'document', 'certificate', 'letter'],
-        'arabic': ['خطاب', 'شهادة', 'شهاده', 'نموذج', 'وثيقة', 'وثيقه', 'رسالة', 'رساله', 'مستند']
-    }
-    if any(keyword in query_lower for keyword in template_keywords['english']) or \
-       any(keyword in query for keyword in template_keywords['arabic']):
+    if _TEMPLATE_RE.search(query_norm):
         return 'general_template_request'
     
     return None
@@ -169,160 +239,186 @@ def detect_template_intent_multilingual(query: str) -> Optional[str]:
 # APPROVAL DETECTION (FOR MANAGERS)
 # ============================================
 
+# View pending requests
+VIEW_KEYWORDS = {
+    'english': [
+        'pending requests', 'pending time off', 'pending leave',
+        'requests pending', 'time off requests', 'leave requests',
+        'approve requests', 'review requests', 'show requests',
+        'view requests', 'check requests', 'my team requests'
+    ],
+    'arabic': [
+        'طلبات معلقة', 'طلبات معلقه', 'الطلبات المعلقة', 'الطلبات المعلقه',
+        'طلبات إجازة', 'طلبات اجازة', 'طلبات الإجازة', 'طلبات الاجازة',
+        'طلبات فريقي', 'طلبات موظفيني', 'طلبات الموظفين'
+    ]
+}
+
+# Approve keywords
+APPROVE_KEYWORDS = {
+    'english': [
+        'approve request', 'approve time off', 'approve leave',
+        'approve id', 'approve #', 'yes approve', 'confirm request',
+        'accept request', 'grant time off', 'grant leave'
+    ],
+    'arabic': [
+        'موافقة طلب', 'موافقه طلب', 'أوافق على', 'اوافق على',
+        'قبول طلب', 'اقبل طلب', 'أقبل طلب', 'موافق على الطلب'
+    ]
+}
+
+# Deny keywords
+DENY_KEYWORDS = {
+    'english': [
+        'deny request', 'deny time off', 'deny leave',
+        'reject request', 'reject time off', 'reject leave',
+        'decline request', 'refuse request'
+    ],
+    'arabic': [
+        'رفض طلب', 'أرفض طلب', 'ارفض طلب',
+        'لا أوافق', 'لا اوافق', 'رفض الطلب'
+    ]
+}
+
+_VIEW_RE = _bilingual_regex(VIEW_KEYWORDS)
+_APPROVE_RE = _bilingual_regex(APPROVE_KEYWORDS)
+_DENY_RE = _bilingual_regex(DENY_KEYWORDS)
+
+# "approve 123" / "موافقة 123" style commands; the matching group name is the intent.
+# Anchored lookaheads keep approve ahead of deny wherever each occurs in the text
+_APPROVAL_NUMBER_RE = re.compile(
+    r'(?=.*?(?:\b(?:approve|accept|grant)\s+\d+\b|(?:موافقه|اوافق)\s*\d+))(?P<approve>)'
+    r'|(?=.*?(?:\b(?:deny|reject|decline|refuse)\s+\d+\b|(?:رفض|ارفض)\s*\d+))(?P<deny>)',
+    re.DOTALL
+)
+
+@lru_cache(maxsize=512)
 def detect_approval_intent_multilingual(query: str) -> Optional[str]:
     """Detect if the user (manager) is trying to approve/deny requests"""
-    query_lower = query.lower()
-    
-    # View pending requests
-    view_keywords = {
-        'english': [
-            'pending requests', 'pending time off', 'pending leave',
-            'requests pending', 'time off requests', 'leave requests',
-            'approve requests', 'review requests', 'show requests',
-            'view requests', 'check requests', 'my team requests'
-        ],
-        'arabic': [
-            'طلبات معلقة', 'طلبات معلقه', 'الطلبات المعلقة', 'الطلبات المعلقه',
-            'طلبات إجازة', 'طلبات اجازة', 'طلبات الإجازة', 'طلبات الاجازة',
-            'طلبات فريقي', 'طلبات موظفيني', 'طلبات الموظفين'
-        ]
-    }
-    
-    # Approve keywords
-    approve_keywords = {
-        'english': [
-            'approve request', 'approve time off', 'approve leave',
-            'approve id', 'approve #', 'yes approve', 'confirm request',
-            'accept request', 'grant time off', 'grant leave'
-        ],
-        'arabic': [
-            'موافقة طلب', 'موافقه طلب', 'أوافق على', 'اوافق على',
-            'قبول طلب', 'اقبل طلب', 'أقبل طلب', 'موافق على الطلب'
-        ]
-    }
-    
-    # Deny keywords
-    deny_keywords = {
-        'english': [
-            'deny request', 'deny time off', 'deny leave',
-            'reject request', 'reject time off', 'reject leave',
-            'decline request', 'refuse request'
-        ],
-        'arabic': [
-            'رفض طلب', 'أرفض طلب', 'ارفض طلب',
-            'لا أوافق', 'لا اوافق', 'رفض الطلب'
-        ]
-    }
+    query_norm = normalize_query(query)
     
     # Check intents
-    if any(keyword in query_lower for keyword in approve_keywords['english']) or \
-       any(keyword in query for keyword in approve_keywords['arabic']):
+    if _APPROVE_RE.search(query_norm):
         return 'approve'
         
-    if any(keyword in query_lower for keyword in deny_keywords['english']) or \
-       any(keyword in query for keyword in deny_keywords['arabic']):
+    if _DENY_RE.search(query_norm):
         return 'deny'
         
-    if any(keyword in query_lower for keyword in view_keywords['english']) or \
-       any(keyword in query for keyword in view_keywords['arabic']):
+    if _VIEW_RE.search(query_norm):
         return 'view_pending'
     
     # Pattern matching for "approve 123" or "موافقة 123"
-    if re.search(r'\b(approve|accept|grant)\s+\d+\b', query_lower) or \
-       re.search(r'(موافقة|موافقه|أوافق|اوافق)\s*\d+', query):
-        return 'approve'
-        
-    if re.search(r'\b(deny|reject|decline|refuse)\s+\d+\b', query_lower) or \
-       re.search(r'(رفض|أرفض|ارفض)\s*\d+', query):
-        return 'deny'
-    
-    return None
+    match = _APPROVAL_NUMBER_RE.match(query_norm)
+    return match.lastgroup if match else None
 
 # ============================================
 # EXIT INTENT DETECTION
 # ============================================
 
+# Frozensets: the whole-message checks below are O(1) hash lookups
+EXIT_KEYWORDS = {
+    'english': frozenset([
+        'cancel', 'exit', 'stop', 'quit', 'nevermind', 'never mind',
+        'back', 'go back', 'return', 'normal chat', 'regular chat',
+        'forget it', 'skip', 'abort', 'done', 'finish'
+    ]),
+    'arabic': frozenset([
+        'إلغاء', 'الغاء', 'ألغي', 'الغي', 'ألغ', 'الغ',
+        'توقف', 'أوقف', 'اوقف', 'قف',
+        'رجوع', 'ارجع', 'أرجع', 'عودة', 'عوده',
+        'خروج', 'اخرج', 'أخرج',
+        'انهي', 'أنهي', 'انتهى', 'انتهيت',
+        'كفاية', 'كفايه', 'خلاص', 'بس'
+    ])
+}
+
+_EXIT_RE = _bilingual_regex(EXIT_KEYWORDS)
+# Whole-message fast path; the substring scan below also covers these
+_EXIT_EXACT = frozenset(
+    k.translate(_ARABIC_NORMALIZATION) for k in EXIT_KEYWORDS['english'] | EXIT_KEYWORDS['arabic']
+)
+
+@lru_cache(maxsize=512)
 def detect_exit_intent_multilingual(query: str) -> bool:
     """Detect if the user wants to exit the current flow"""
-    query_lower = query.lower().strip()
+    query_norm = normalize_query(query).strip()
     
-    exit_keywords = {
-        'english': [
-            'cancel', 'exit', 'stop', 'quit', 'nevermind', 'never mind',
-            'back', 'go back', 'return', 'normal chat', 'regular chat',
-            'forget it', 'skip', 'abort', 'done', 'finish'
-        ],
-        'arabic': [
-            'إلغاء', 'الغاء', 'ألغي', 'الغي', 'ألغ', 'الغ',
-            'توقف', 'أوقف', 'اوقف', 'قف',
-            'رجوع', 'ارجع', 'أرجع', 'عودة', 'عوده',
-            'خروج', 'اخرج', 'أخرج',
-            'انهي', 'أنهي', 'انتهى', 'انتهيت',
-            'كفاية', 'كفايه', 'خلاص', 'بس'
-        ]
-    }
-    
-    return query_lower in exit_keywords['english'] or \
-           query.strip() in exit_keywords['arabic'] or \
-           any(keyword in query_lower for keyword in exit_keywords['english']) or \
-           any(keyword in query for keyword in exit_keywords['arabic'])
+    return query_norm in _EXIT_EXACT or bool(_EXIT_RE.search(query_norm))
+
+def clear_detection_cache():
+    """Drop memoized detector results and normalized queries (called on logout)"""
+    for detector in (
+        normalize_query,
+        detect_time_off_intent_multilingual,
+        detect_overtime_intent_multilingual,
+        detect_template_intent_multilingual,
+        detect_approval_intent_multilingual,
+        detect_exit_intent_multilingual,
+    ):
+        detector.cache_clear()
 
 # ============================================
 # DATE PARSING
 # ============================================
 
+# Arabic month names
+ARABIC_MONTHS = {
+    'يناير': 1, 'كانون الثاني': 1,
+    'فبراير': 2, 'شباط': 2,
+    'مارس': 3, 'آذار': 3,
+    'أبريل': 4, 'ابريل': 4, 'نيسان': 4,
+    'مايو': 5, 'أيار': 5,
+    'يونيو': 6, 'حزيران': 6,
+    'يوليو': 7, 'تموز': 7,
+    'أغسطس': 8, 'اغسطس': 8, 'آب': 8,
+    'سبتمبر': 9, 'أيلول': 9,
+    'أكتوبر': 10, 'اكتوبر': 10, 'تشرين الأول': 10,
+    'نوفمبر': 11, 'تشرين الثاني': 11,
+    'ديسمبر': 12, 'كانون الأول': 12
+}
+
+# Longest names first so multi-word months win over any shorter overlap
+_ARABIC_MONTHS_ORDERED = tuple(sorted(ARABIC_MONTHS.items(), key=lambda kv: len(kv[0]), reverse=True))
+_ARABIC_MONTH_RE = re.compile('|'.join(re.escape(name) for name, _ in _ARABIC_MONTHS_ORDERED))
+_DAY_NUMBER_RE = re.compile(r'(\d+)')
+
+# Relative-day words, one named group per offset; 'بعد غد' is listed before
+# 'غدا' so "بعد غدا" is read as the day after tomorrow
+_RELATIVE_DATE_RE = re.compile(
+    r'(?P<today>اليوم)|(?P<after_tomorrow>بعد غد)|(?P<tomorrow>غداً|غدا|بكرة|بكره)'
+)
+_RELATIVE_DAY_OFFSETS = (('today', 0), ('tomorrow', 1), ('after_tomorrow', 2))
+
 def parse_arabic_date(date_str: str) -> Optional[str]:
     """Parse Arabic date expressions and return ISO format"""
-    
-    # Arabic month names
-    arabic_months = {
-        'يناير': 1, 'كانون الثاني': 1,
-        'فبراير': 2, 'شباط': 2,
-        'مارس': 3, 'آذار': 3,
-        'أبريل': 4, 'ابريل': 4, 'نيسان': 4,
-        'مايو': 5, 'أيار': 5,
-        'يونيو': 6, 'حزيران': 6,
-        'يوليو': 7, 'تموز': 7,
-        'أغسطس': 8, 'اغسطس': 8, 'آب': 8,
-        'سبتمبر': 9, 'أيلول': 9,
-        'أكتوبر': 10, 'اكتوبر': 10, 'تشرين الأول': 10,
-        'نوفمبر': 11, 'تشرين الثاني': 11,
-        'ديسمبر': 12, 'كانون الأول': 12
-    }
-    
     today = datetime.now()
     
-    # Handle relative dates
-    if 'اليوم' in date_str:
-        return today.strftime('%Y-%m-%d')
-    elif any(word in date_str for word in ['غدا', 'غداً', 'بكرة', 'بكره']):
-        return (today + timedelta(days=1)).strftime('%Y-%m-%d')
-    elif 'بعد غد' in date_str:
-        return (today + timedelta(days=2)).strftime('%Y-%m-%d')
+    # Handle relative dates (one scan; today > tomorrow > day after, as before)
+    found = {match.lastgroup for match in _RELATIVE_DATE_RE.finditer(date_str)}
+    for group, days in _RELATIVE_DAY_OFFSETS:
+        if group in found:
+            return (today + timedelta(days=days)).strftime('%Y-%m-%d')
     
     # Try to parse month and day
-    for month_name, month_num in arabic_months.items():
-        if month_name in date_str:
-            day_match = re.search(r'(\d+)', date_str)
-            if day_match:
-                day = int(day_match.group(1))
-                year = today.year
-                try:
-                    parsed_date = datetime(year, month_num, day)
-                    if parsed_date < today:
-                        parsed_date = datetime(year + 1, month_num, day)
-                    return parsed_date.strftime('%Y-%m-%d')
-                except ValueError:
-                    continue
+    for month_match in _ARABIC_MONTH_RE.finditer(date_str):
+        day_match = _DAY_NUMBER_RE.search(date_str)
+        if not day_match:
+            return None
+        month_num = ARABIC_MONTHS[month_match.group()]
+        day = int(day_match.group(1))
+        year = today.year
+        try:
+            parsed_date = datetime(year, month_num, day)
+            if parsed_date < today:
+                parsed_date = datetime(year + 1, month_num, day)
+            return parsed_date.strftime('%Y-%m-%d')
+        except ValueError:
+            continue
     
     return None
 
+_ARABIC_TO_ENGLISH_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩', '0123456789')
+
 def convert_arabic_numerals(text: str) -> str:
     """Convert Arabic numerals to English numerals"""
-    arabic_to_english = {
-        '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
-        '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9'
-    }
-    for ar, en in arabic_to_english.items():
-        text = text.replace(ar, en)
-    return text
\ No newline at end of file
+    return text.translate(_ARABIC_TO_ENGLISH_DIGITS)
\ No newline at end of file
@@ -3,50 +3,98 @@ import streamlit as st
 import xmlrpc.client
 import json
 from cryptography.fernet import Fernet
-import pickle
 import hashlib
 import datetime
 import os
-from odoo_connector import connect_to_odoo, get_current_user_employee_data
+import tempfile
+import time
+from odoo_connector import connect_to_odoo, get_current_user_employee_data, get_server_proxy
+from arabic_english_detection import clear_detection_cache
 
 # Cache directory for storing credentials and connection data
+# (created lazily by the first write, see _ensure_cache_dir)
 CACHE_DIR = os.path.join(os.path.expanduser("~"), ".prezlab_cache")
-os.makedirs(CACHE_DIR, exist_ok=True)
 
 # Credential storage configuration
 CREDENTIAL_FILE = os.path.join(CACHE_DIR, "credentials.enc")
 KEY_FILE = os.path.join(CACHE_DIR, "key.key")
-CONNECTION_CACHE_FILE = os.path.join(CACHE_DIR, "connection_cache.pkl")
+CREDENTIAL_MAX_AGE = 30 * 86400  # seconds
+CONNECTION_CACHE_DIR = os.path.join(CACHE_DIR, "connection_cache")
+CONNECTION_CACHE_TTL = 3600  # seconds
 
-class CredentialManager:
-    """Securely store and retrieve user credentials"""
-    
-    def __init__(self):
-        self.key = self._get_or_create_key()
-        self.cipher = Fernet(self.key)
-    
-    def _get_or_create_key(self):
-        """Get existing key or create a new one"""
+_CACHE_DIR_READY = False
+
+def _ensure_cache_dir():
+    """Create the cache directories on first write instead of at import (once per process)"""
+    global _CACHE_DIR_READY
+    if _CACHE_DIR_READY:
+        return
+    os.makedirs(CONNECTION_CACHE_DIR, exist_ok=True)
+    # One-time migration: the old single-file caches are never read again
+    for legacy_cache in ("connection_cache.pkl", "connection_cache.json"):
+        try:
+            os.remove(os.path.join(CACHE_DIR, legacy_cache))
+        except OSError:
+            pass
+    _CACHE_DIR_READY = True
+
+def _atomic_write(path, data, binary=True):
+    """Write to a temp file next to path and swap it in, so readers never see a partial file"""
+    _ensure_cache_dir()
+    # Sessions are threads of one process, so the temp name must be unique per write
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        if binary:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+        else:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        # Only still present if the write or the swap failed
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+# Key bytes and cipher are shared by every CredentialManager in the process
+_KEY_CACHE = None
+_CIPHER_CACHE = None
+
+def _get_or_create_key():
+    """Get existing key or create a new one (read from disk once per process)"""
+    global _KEY_CACHE
+    if _KEY_CACHE is None:
         if os.path.exists(KEY_FILE):
             with open(KEY_FILE, 'rb') as f:
-                return f.read()
+                _KEY_CACHE = f.read()
         else:
             key = Fernet.generate_key()
-            with open(KEY_FILE, 'wb') as f:
-                f.write(key)
-            return key
+            _atomic_write(KEY_FILE, key)
+            _KEY_CACHE = key
+    return _KEY_CACHE
+
+def _get_cipher():
+    """Shared Fernet instance; encrypt/decrypt keep no per-call state"""
+    global _CIPHER_CACHE
+    if _CIPHER_CACHE is None:
+        _CIPHER_CACHE = Fernet(_get_or_create_key())
+    return _CIPHER_CACHE
+
+class CredentialManager:
+    """Securely store and retrieve user credentials"""
+    
+    def __init__(self):
+        self.key = _get_or_create_key()
+        self.cipher = _get_cipher()
     
     def save_credentials(self, username, password):
-        """Save encrypted credentials"""
-        credentials = {
-            'username': username,
-            'password': password,
-            'timestamp': datetime.datetime.now().isoformat()
-        }
-        encrypted = self.cipher.encrypt(json.dumps(credentials).encode())
-        
-        with open(CREDENTIAL_FILE, 'wb') as f:
-            f.write(encrypted)
+        """Save encrypted credentials as a NUL-separated username/password/timestamp payload"""
+        if '\x00' in username or '\x00' in password:
+            # Can't be framed (and Odoo never issues such logins); don't remember it
+            self.clear_credentials()
+            return
+        payload = f"{username}\x00{password}\x00{time.time()}".encode()
+        _atomic_write(CREDENTIAL_FILE, self.cipher.encrypt(payload))
     
     def load_credentials(self):
         """Load and decrypt credentials"""
@@ -58,11 +106,20 @@ class CredentialManager:
                 encrypted = f.read()
             
             decrypted = self.cipher.decrypt(encrypted)
-            credentials = json.loads(decrypted.decode())
+            if b'\x00' in decrypted:
+                username, password, timestamp = decrypted.decode().split('\x00', 2)
+                timestamp = float(timestamp)
+            else:
+                # Files saved before the NUL-separated format held JSON
+                legacy = json.loads(decrypted.decode())
+                username, password, timestamp = legacy['username'], legacy['password'], legacy['timestamp']
+                if isinstance(timestamp, str):
+                    # ...and before that, ISO timestamps
+                    timestamp = datetime.datetime.fromisoformat(timestamp).timestamp()
+            credentials = {'username': username, 'password': password, 'timestamp': timestamp}
             
             # Check if credentials are not too old (30 days)
-            timestamp = datetime.datetime.fromisoformat(credentials['timestamp'])
-            if datetime.datetime.now() - timestamp > datetime.timedelta(days=30):
+            if time.time() - timestamp > CREDENTIAL_MAX_AGE:
                 self.clear_credentials()
                 return None
             
@@ -76,67 +133,76 @@ class CredentialManager:
         if os.path.exists(CREDENTIAL_FILE):
             os.remove(CREDENTIAL_FILE)
 
+_SAVED_CREDENTIALS_KEY = '_saved_credentials'
+
+def load_saved_credentials(cred_manager):
+    """
+    Load saved credentials once per session instead of on every logged-out rerun.
+    Kept in session_state (never a process-wide cache) since it holds the password;
+    cleared by AuthManager whenever the credential file is written or removed.
+    """
+    if _SAVED_CREDENTIALS_KEY not in st.session_state:
+        st.session_state[_SAVED_CREDENTIALS_KEY] = cred_manager.load_credentials()
+    credentials = st.session_state[_SAVED_CREDENTIALS_KEY]
+    # The session may outlive the 30-day window the file was checked against
+    if credentials and time.time() - credentials['timestamp'] > CREDENTIAL_MAX_AGE:
+        cred_manager.clear_credentials()
+        credentials = st.session_state[_SAVED_CREDENTIALS_KEY] = None
+    return credentials
+
+def clear_saved_credentials():
+    """Drop this session's copy so the next load_saved_credentials rereads the file"""
+    st.session_state.pop(_SAVED_CREDENTIALS_KEY, None)
+
 class ConnectionCache:
     """Cache Odoo connection data to speed up subsequent logins"""
     
     @staticmethod
     def get_cache_key(username, db):
         """Generate a cache key based on username and database"""
-        return hashlib.md5(f"{username}:{db}".encode()).hexdigest()
+        return hashlib.blake2b(f"{username}:{db}".encode(), digest_size=8).hexdigest()
+    
+    @staticmethod
+    def get_cache_path(cache_key):
+        """One small file per user/database so logins never touch each other's entries"""
+        return os.path.join(CONNECTION_CACHE_DIR, f"{cache_key}.json")
     
     @staticmethod
     def save_connection_data(username, db, uid, employee_data):
         """Save connection data to cache"""
-        cache_key = ConnectionCache.get_cache_key(username, db)
+        cache_path = ConnectionCache.get_cache_path(ConnectionCache.get_cache_key(username, db))
         cache_data = {
             'uid': uid,
             'employee_data': employee_data,
-            'timestamp': datetime.datetime.now().isoformat()
+            'timestamp': time.time()
         }
-        
-        # Load existing cache
-        cache = {}
-        if os.path.exists(CONNECTION_CACHE_FILE):
-            try:
-                with open(CONNECTION_CACHE_FILE, 'rb') as f:
-                    cache = pickle.load(f)
-            except:
-                cache = {}
-        
-        # Update cache
-        cache[cache_key] = cache_data
-        
-        # Save updated cache
-        with open(CONNECTION_CACHE_FILE, 'wb') as f:
-            pickle.dump(cache, f)
+        _atomic_write(cache_path, json.dumps(cache_data, default=str), binary=False)
     
     @staticmethod
     def get_connection_data(username, db):
         """Get cached connection data"""
-        if not os.path.exists(CONNECTION_CACHE_FILE):
-            return None
-        
-        cache_key = ConnectionCache.get_cache_key(username, db)
+        cache_path = ConnectionCache.get_cache_path(ConnectionCache.get_cache_key(username, db))
         
         try:
-            with open(CONNECTION_CACHE_FILE, 'rb') as f:
-                cache = pickle.load(f)
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
             
-            if cache_key in cache:
-                cache_data = cache[cache_key]
-                # Check if cache is not too old (1 hour)
-                timestamp = datetime.datetime.fromisoformat(cache_data['timestamp'])
-                if datetime.datetime.now() - timestamp < datetime.timedelta(hours=1):
-                    return cache_data
-                else:
-                    # Remove old cache entry
-                    del cache[cache_key]
-                    with open(CONNECTION_CACHE_FILE, 'wb') as f:
-                        pickle.dump(cache, f)
+            # Check if cache is not too old (1 hour)
+            if time.time() - data['timestamp'] >= CONNECTION_CACHE_TTL:
+                os.remove(cache_path)
+                return None
             
-            return None
+            return data
         except:
             return None
+    
+    @staticmethod
+    def clear_connection_data(username, db):
+        """Drop a cached entry that Odoo no longer accepts"""
+        try:
+            os.remove(ConnectionCache.get_cache_path(ConnectionCache.get_cache_key(username, db)))
+        except OSError:
+            pass
 
 def fast_connect_to_odoo(odoo_url, odoo_db, username, password, use_cache=True):
     """
@@ -146,16 +212,16 @@ def fast_connect_to_odoo(odoo_url, odoo_db, username, password, use_cache=True):
     if use_cache:
         cached_data = ConnectionCache.get_connection_data(username, odoo_db)
         if cached_data:
-            # Validate the cached UID is still valid
+            # The cached path skips authenticate(), so this single read is what
+            # verifies the password; it also confirms the cached UID still exists
             try:
-                models = xmlrpc.client.ServerProxy(f'{odoo_url}/xmlrpc/2/object', allow_none=True)
-                # Quick validation call
-                test = models.execute_kw(
+                models = get_server_proxy(f'{odoo_url}/xmlrpc/2/object')
+                user = models.execute_kw(
                     odoo_db, cached_data['uid'], password,
-                    'res.users', 'check_access_rights',
-                    ['read'], {'raise_exception': False}
+                    'res.users', 'read',
+                    [cached_data['uid']], {'fields': ['id']}
                 )
-                if test:
+                if user:
                     # Cache is valid
                     st.session_state.odoo_uid = cached_data['uid']
                     st.session_state.odoo_models = models
@@ -165,6 +231,10 @@ def fast_connect_to_odoo(odoo_url, odoo_db, username, password, use_cache=True):
                     st.session_state.employee_data = cached_data['employee_data']
                     st.session_state.auto_loaded = True
                     return True, "Connected to Odoo (cached)", "Connected successfully"
+                ConnectionCache.clear_connection_data(username, odoo_db)
+            except xmlrpc.client.Fault:
+                # Rejected by Odoo: drop the entry so later logins don't retry it
+                ConnectionCache.clear_connection_data(username, odoo_db)
             except:
                 pass
     
@@ -199,6 +269,7 @@ class AuthManager:
                 # Save credentials if remember me is checked
                 if remember_me:
                     self.cred_manager.save_credentials(username, password)
+                    clear_saved_credentials()
                 
                 st.session_state.logged_in = True
                 st.session_state.username = username
@@ -216,6 +287,8 @@ class AuthManager:
         """Clear session and logout"""
         # Clear saved credentials first
         self.cred_manager.clear_credentials()
+        clear_saved_credentials()
+        clear_detection_cache()
         
         # Clear all session state
         for key in list(st.session_state.keys()):
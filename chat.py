@@ -1,11 +1,12 @@
 ﻿# chat.py
 import streamlit as st
-from openai_helper import generate_ai_response
-from ui_components import render_chat_message
-from activity_tracker import track_template_generation
+from collections import deque
 import base64
 import time
 
+# Oldest messages drop off once a chat grows past this
+MAX_CHAT_MESSAGES = 200
+
 class ChatManager:
     def __init__(self):
         self._initialize_session_state()
@@ -13,7 +14,7 @@ class ChatManager:
     def _initialize_session_state(self):
         """Initialize chat-related session state variables"""
         if 'messages' not in st.session_state:
-            st.session_state.messages = []
+            st.session_state.messages = deque(maxlen=MAX_CHAT_MESSAGES)
         if 'template_bytes' not in st.session_state:
             st.session_state.template_bytes = None
         if 'template_filename' not in st.session_state:
@@ -25,27 +26,65 @@ class ChatManager:
     
     def clear_history(self):
         """Clear chat history and any associated documents"""
-        st.session_state.messages = []
+        st.session_state.messages.clear()
         st.session_state.template_bytes = None
         st.session_state.template_filename = None
 
     def get_download_link(self, data: bytes, filename: str, link_text: str = "Download Employment Letter"):
-        b64 = base64.b64encode(data).decode()
-        href = f'data:application/vnd.openxmlformats-officedocument.wordprocessingml.document;base64,{b64}'
+        # template_bytes keeps the same object until a new document replaces it,
+        # so one encode per document is enough
+        cached = st.session_state.get("_cached_download_href")
+        if cached and cached[0] is data:
+            href = cached[1]
+        else:
+            b64 = base64.b64encode(data).decode()
+            href = f'data:application/vnd.openxmlformats-officedocument.wordprocessingml.document;base64,{b64}'
+            st.session_state._cached_download_href = (data, href)
         return f'<a href="{href}" download="{filename}" style="display:inline-block;margin-top:8px;font-weight:bold;color:#6B46C1;">{link_text}</a>'
 
     # ─────────────────── UI / CHAT RENDERING ───────────────────
+    def _message_html(self, msg):
+        """
+        Bubble HTML for one history message. Plain messages are built once and
+        kept on the message as '_html'; download links follow the current
+        template so they are rebuilt each time (None if no file is ready).
+        """
+        html = msg.get("_html")
+        if html is not None:
+            return html
+
+        content = msg["content"]
+        if msg["role"] == "user":
+            html = f'<div class="user-bubble"><span>{content}</span></div>'
+        elif content[:14] == "[DOWNLOAD_LINK":
+            if not (st.session_state.get("template_bytes") and st.session_state.get("template_filename")):
+                return None
+            # Support custom link text: [DOWNLOAD_LINK|Custom Text]
+            link_text = "Download Employment Letter"
+            head, sep, tail = content.partition("|")
+            if sep and head == "[DOWNLOAD_LINK" and tail.endswith("]"):
+                link_text = tail[:-1]
+            link_html = self.get_download_link(
+                st.session_state["template_bytes"],
+                st.session_state["template_filename"],
+                link_text
+            )
+            return f'<div class="bot-bubble">{link_html}</div>'
+        else:
+            html = f'<div class="bot-bubble">{content}</div>'
+
+        msg["_html"] = html
+        return html
+
     def display_chat_interface(self, employee_data):
         """
         Draws the conversation using Streamlit's chat API
         while the CSS from StyleManager turns them into bubbles.
         """
         import streamlit as st
-        from style_manager import StyleManager
         from openai_helper import generate_ai_response
 
-        # 1️⃣  inject CSS once per page
-        StyleManager().load_css()
+        # 1️⃣  CSS is injected by app.py on every run, before this is called
 
         # 2️⃣  ensure a document generation activity is logged if a file is ready
         try:
@@ -53,6 +92,7 @@ class ChatManager:
             file_bytes = st.session_state.get("template_bytes")
             last_logged = st.session_state.get("_last_logged_template_filename")
             if file_bytes and filename_ready and last_logged != filename_ready:
+                from activity_tracker import track_template_generation
                 track_template_generation(template_type="document", details={"filename": filename_ready})
                 st.session_state._last_logged_template_filename = filename_ready
         except Exception:
@@ -60,32 +100,10 @@ class ChatManager:
 
         # 3️⃣  history
         for msg in st.session_state.messages:
+            html = self._message_html(msg)
             with st.chat_message(msg["role"]):
-                if msg["role"] == "user":
-                    st.markdown(f'<div class="user-bubble"><span>{msg["content"]}</span></div>', unsafe_allow_html=True)
-                else:
-                    content = msg["content"]
-                    if content == "[DOWNLOAD_LINK]":
-                        if st.session_state.get("template_bytes") and st.session_state.get("template_filename"):
-                            link_html = self.get_download_link(
-                                st.session_state["template_bytes"],
-                                st.session_state["template_filename"]
-                            )
-                            st.markdown(f'<div class="bot-bubble">{link_html}</div>', unsafe_allow_html=True)
-                    elif content.startswith("[DOWNLOAD_LINK"):
-                        if st.session_state.get("template_bytes") and st.session_state.get("template_filename"):
-                            # Support custom link text: [DOWNLOAD_LINK|Custom Text]
-                            link_text = "Download Employment Letter"
-                            if content.startswith("[DOWNLOAD_LINK|") and content.endswith("]"):
-                                link_text = content[len("[DOWNLOAD_LINK|"):-1]
-                            link_html = self.get_download_link(
-                                st.session_state["template_bytes"],
-                                st.session_state["template_filename"],
-                                link_text
-                            )
-                            st.markdown(f'<div class="bot-bubble">{link_html}</div>', unsafe_allow_html=True)
-                    else:
-                        st.markdown(f'<div class="bot-bubble">{content}</div>', unsafe_allow_html=True)
+                if html is not None:
+                    st.markdown(html, unsafe_allow_html=True)
 
         # Add scroll target at the bottom of messages
         st.markdown('<div id="chat-bottom" style="height: 1px;"></div>', unsafe_allow_html=True)
@@ -113,50 +131,52 @@ class ChatManager:
         # Add a bottom spacer that ensures the last message is visible above fixed input
         st.markdown('<div id="scroll-anchor-bottom" style="height: 260px; width: 100%;"></div>', unsafe_allow_html=True)
         
-        # Force scroll using component that can execute JavaScript
-        if len(st.session_state.messages) > 0:
+        # Force scroll using component that can execute JavaScript, only when
+        # a new message arrived since the last render (the history is capped,
+        # so its length alone stops changing once it is full)
+        messages = st.session_state.messages
+        last_msg = messages[-1] if messages else None
+        last_rendered = st.session_state.get("_last_rendered_msg")
+        st.session_state._last_rendered_msg = last_msg
+        if last_msg is not None and last_msg is not last_rendered:
             import streamlit.components.v1 as components
             components.html(f"""
             <script>
             (function() {{
-              var attempts = 0;
-              function doScroll() {{
-                attempts += 1;
-                var parentDoc = parent.document;
-                
+              var parentDoc = parent.document;
+              
+              function scrollToLast() {{
                 // 1) Scroll the explicit anchor if present
                 var anchor = parentDoc.querySelector('#scroll-anchor-bottom') || parentDoc.querySelector('#chat-bottom');
                 if (anchor && anchor.scrollIntoView) {{
-                  anchor.scrollIntoView({{ behavior: 'smooth', block: 'end' }});
-                  // Nudge past the fixed input overlay
-                  setTimeout(function() {{ parent.window.scrollBy(0, 420); }}, 80);
+                  anchor.scrollIntoView({{ block: 'end' }});
+                  return true;
                 }}
                 
-                // 2) Also scroll the last chat message
-                var container = parentDoc.querySelector('[data-testid="stChatMessageContainer"]');
-                if (container) {{
-                  var children = container.querySelectorAll('[data-testid="stChatMessage"]');
-                  if (children && children.length) {{
-                    var last = children[children.length - 1];
-                    if (last && last.scrollIntoView) {{
-                      last.scrollIntoView({{ behavior: 'smooth', block: 'nearest' }});
-                      setTimeout(function() {{ parent.window.scrollBy(0, 420); }}, 100);
-                    }}
-                  }} else {{
-                    // Fallback: force container scroll
-                    container.scrollTop = container.scrollHeight + 800;
-                  }}
+                // 2) Otherwise the last chat message
+                var children = parentDoc.querySelectorAll('[data-testid="stChatMessage"]');
+                if (children.length && children[children.length - 1].scrollIntoView) {{
+                  children[children.length - 1].scrollIntoView({{ block: 'end' }});
+                  return true;
                 }}
                 
                 // 3) Fallback to window scroll
-                parent.window.scrollTo(0, parentDoc.body.scrollHeight + 800);
-                
-                // Retry a few times to catch post-render updates
-                if (attempts < 10) {{
-                  setTimeout(doScroll, 300);
-                }}
+                parent.window.scrollTo(0, parentDoc.body.scrollHeight);
+                return false;
+              }}
+              
+              scrollToLast();
+              
+              // Catch the new message as it lands instead of polling, then stop
+              // watching so later page updates never pull the user back down
+              var container = parentDoc.querySelector('[data-testid="stChatMessageContainer"]');
+              if (container) {{
+                var observer = new MutationObserver(function() {{
+                  if (scrollToLast()) observer.disconnect();
+                }});
+                observer.observe(container, {{ childList: true }});
+                setTimeout(function() {{ observer.disconnect(); }}, 2000);
               }}
-              setTimeout(doScroll, 500);
             }})();
             </script>
             """, height=0)
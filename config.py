@@ -1,4 +1,5 @@
 import streamlit as st
+from types import MappingProxyType
 
 # OpenAI API Key - loaded from Streamlit secrets
 OPENAI_API_KEY = st.secrets["OPENAI_API_KEY"]
@@ -11,7 +12,8 @@ ODOO_PASSWORD = st.secrets["ODOO_PASSWORD"]
 
 # Odoo model field mappings
 # Dictionary of relation models for resolving Many2one relationships
-RELATION_MODELS = {
+# (read-only: shared by every session in the process)
+RELATION_MODELS = MappingProxyType({
     'department_id': 'hr.department',
     'parent_id': 'hr.employee',
     'coach_id': 'hr.employee',
@@ -26,13 +28,13 @@ RELATION_MODELS = {
     'resource_id': 'resource.resource',      # Resource relation
     'sale_line_id': 'sale.order.line',       # Sales order line relation
     'place_id': 'res.partner'                # Work place relation
-}
+})
 
 # Basic employee fields that are safe to request
-EMPLOYEE_BASIC_FIELDS = ['name', 'job_title', 'work_email', 'work_phone', 'department_id']
+EMPLOYEE_BASIC_FIELDS = ('name', 'job_title', 'work_email', 'work_phone', 'department_id')
 
 # Additional employee fields that might require permissions
-EMPLOYEE_ADDITIONAL_FIELDS = [
+EMPLOYEE_ADDITIONAL_FIELDS = (
     'mobile_phone', 
     'identification_id',
     'gender',
@@ -52,14 +54,14 @@ EMPLOYEE_ADDITIONAL_FIELDS = [
     'x_studio_employee_arabic_name',  # Arabic name field
     'x_studio_joining_date',  # Joining date field
     'x_studio_contract_end_date'  # Contract end date field
-]
+)
 
 # Partner fields to retrieve
-PARTNER_FIELDS = [
+PARTNER_FIELDS = (
     'name', 'email', 'phone', 'mobile', 
     'street', 'city', 'zip', 'country_id',
     'function', 'title', 'company_id', 'user_id'
-]
+)
 
 # OpenAI model configuration
 OPENAI_MODEL = "gpt-3.5-turbo"
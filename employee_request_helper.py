@@ -1,8 +1,10 @@
 # employee_request_helper.py - Enhanced version with hybrid intent detection
 import streamlit as st
 import re
+import time
+from functools import cache, lru_cache
 from datetime import datetime, timedelta
-import openai
+from rapidfuzz import fuzz, process
 from config import OPENAI_API_KEY, OPENAI_MODEL
 from odoo_connector import (
     get_available_leave_types, create_time_off_request, get_employee_leave_balance,
@@ -17,149 +19,231 @@ from arabic_english_detection import (
     detect_template_intent_multilingual,
     parse_arabic_date,
     convert_arabic_numerals,
+    contains_arabic,
     detect_exit_intent_multilingual
 )
 from typing import Optional
 from activity_tracker import track_time_off_request, track_template_generation
 
-# Set up OpenAI for intent detection (optional)
-openai.api_key = OPENAI_API_KEY
+# Explicit non-requests (questions about balance, history, etc.)
+NON_REQUEST_PATTERNS = [
+    r'how many days',
+    r'how much (leave|time off|vacation)',
+    r'check my (leave|balance|time off)',
+    r'(leave|vacation|time off) balance',
+    r'days (remaining|left|available)',
+    r'did i take',
+    r'have i taken',
+    r'days i took',
+    r'time off history',
+    r'leave history',
+    r'show my (leave|time off)',
+    r'display my (leave|time off)',
+    r'list my (leave|time off)',
+    r'what is my (leave|vacation|time off)',
+    r'do i have (leave|vacation|time off)'
+]
 
-def detect_time_off_intent_nlp(query, use_openai=False):
+# Expanded patterns for time-off requests
+STRONG_REQUEST_PATTERNS = [
+    # Direct requests
+    r'\b(i|I)(\s+would\s+like\s+to|\s+want\s+to|\s+need\s+to|\s+have\s+to|\s+must)?\s*(request|take|book|apply\s+for|get|have)\s+(some\s+)?(time\s*off|leave|vacation|holiday|pto|days?\s+off)\b',
+    r'\b(request|requesting|apply\s+for|applying\s+for)\s+(time\s*off|leave|vacation|holiday|pto)\b',
+    r'\b(take|taking|book|booking)\s+(time\s*off|leave|vacation|holiday|pto|days?\s+off)\b',
+    r'\b(need|want|would\s+like)\s+(time\s*off|leave|vacation|holiday|pto|days?\s+off)\b',
+    
+    # Casual expressions
+    r'\bi(\s+want\s+a|\s+need\s+a|\s+would\s+like\s+a)?\s*(vacation|holiday|break|day\s+off)\b',
+    r'\bgoing\s+on\s+(vacation|leave|holiday)\b',
+    r'\bi\'?m\s+(taking|planning)\s+(time\s*off|leave|vacation|holiday)\b',
+    r'\bi\'?ll\s+be\s+(taking|out|off|away)\b',
+    
+    # Future tense indicators
+    r'\bwill\s+be\s+(taking|out|off|away)\s+(on|from|between)\b',
+    r'\bplan(?:ning)?\s+to\s+(take|be)\s+(off|away|out)\b',
+    
+    # Permission requests
+    r'\b(can|may|could)\s+i\s+(take|have|get|request)\s+(time\s*off|leave|vacation|holiday|days?\s+off)\b',
+    r'\bis\s+it\s+(possible|okay|fine)\s+(?:for\s+me\s+)?to\s+(take|request|have)\s+(time\s*off|leave|vacation)\b',
+    
+    # Specific day requests
+    r'\b(sick|personal|annual|unpaid)\s+(day|leave|time\s*off)\b',
+    r'\bcall(?:ing)?\s+in\s+sick\b',
+    r'\bneed\s+.{0,20}\s+off\b',  # "need tomorrow off", "need next week off"
+    
+    # Informal variations
+    r'\btime\s*off\s+request\b',
+    r'\bleave\s+request\b',
+    r'\bpto\s+request\b',
+    r'\bout\s+of\s+office\b',
+    r'\bwon\'?t\s+be\s+(in|at\s+work|available)\b'
+]
+
+MEDIUM_CONFIDENCE_PATTERNS = [
+    # Less direct but still indicative
+    r'\b(vacation|holiday|leave)\s+(in|on|from|starting)\b',
+    r'\boff\s+(work|from\s+work)\s+(on|from)\b',
+    r'\bnot\s+(coming|be)\s+(in|to\s+work)\b',
+    r'\baway\s+from\s+(work|office)\b',
+    r'\btake\s+.{0,10}\s+off\b',  # "take Friday off"
+    r'\bneed\s+.{0,10}\s+for\s+(personal|family|medical)\b',
+    
+    # Single word triggers in certain contexts
+    r'\b(vacation|holiday|leave|pto|time\s*off)\b.*\b(date|when|tomorrow|next|this)\b',
+    r'\b(tomorrow|next\s+week|next\s+month|june|july)\b.*\b(off|vacation|leave)\b'
+]
+
+# Date-related patterns that suggest time off
+DATE_PATTERNS = [
+    r'\b(from|starting)\s+\d{1,2}[/-]\d{1,2}',
+    r'\b(on|for)\s+\d{1,2}[/-]\d{1,2}',
+    r'\b(june|july|august|september|october|november|december|january|february|march|april|may)\s+\d{1,2}',
+    r'\bnext\s+(monday|tuesday|wednesday|thursday|friday|week|month)',
+    r'\btomorrow\b',
+    r'\b\d+\s+days?\b'
+]
+
+def _union_regex(patterns, flags=0):
+    """One alternation over all patterns, so a single scan tells whether any of them match"""
+    return re.compile('|'.join(f'(?:{p})' for p in patterns), flags)
+
+def _count_matching_patterns(compiled, text, limit=None):
+    """How many of the compiled patterns match text, stopping once limit is reached"""
+    count = 0
+    for pattern in compiled:
+        if pattern.search(text):
+            count += 1
+            if count == limit:
+                break
+    return count
+
+# Compiled once at import instead of on every detection call. The unions
+# answer "any match?" in one scan; the per-pattern tuples are only counted
+# when a union hits and the confidence score needs the number of matches
+_NON_REQUEST_RE = _union_regex(NON_REQUEST_PATTERNS)
+_STRONG_REQUEST_RE = _union_regex(STRONG_REQUEST_PATTERNS)
+_STRONG_REQUEST_RES = tuple(map(re.compile, STRONG_REQUEST_PATTERNS))
+_MEDIUM_CONFIDENCE_RE = _union_regex(MEDIUM_CONFIDENCE_PATTERNS)
+_MEDIUM_CONFIDENCE_RES = tuple(map(re.compile, MEDIUM_CONFIDENCE_PATTERNS))
+_DATE_RES = tuple(map(re.compile, DATE_PATTERNS))
+
+# Strong-match confidence is min(0.9, 0.7 + 0.1 * count), which is capped
+# from three matches on, so counting further can't change the score
+_STRONG_MATCH_CAP = 3
+
+# Every strong/medium pattern and the vacation-word fallback needs one of
+# these substrings, so a message without any of them can't be a request
+TIME_OFF_TRIGGERS = [
+    'vacation', 'holiday', 'leave', 'off', 'away', 'pto', 'break',
+    'out', 'taking', 'sick', 'personal', 'annual', 'unpaid', 'won', 'not', 'need'
+]
+_TIME_OFF_TRIGGER_RE = re.compile('|'.join(map(re.escape, TIME_OFF_TRIGGERS)))
+
+# Vacation-related words and temporal context (plain substring checks)
+VACATION_WORDS = ['vacation', 'holiday', 'leave', 'off', 'away', 'pto', 'break']
+TEMPORAL_WORDS = ['tomorrow', 'next', 'this', 'from', 'to', 'between', 'on', 'starting', 'until']
+_VACATION_WORDS_RE = re.compile('|'.join(map(re.escape, VACATION_WORDS)))
+_TEMPORAL_WORDS_RE = re.compile('|'.join(map(re.escape, TEMPORAL_WORDS)))
+
+@lru_cache(maxsize=2048)
+def _time_off_pattern_result(query_lower):
     """
-    Enhanced NLP-based detection of time-off intent
+    Pattern-only part of detect_time_off_intent_nlp, memoized per lowered query
     
-    Args:
-        query: User's message
-        use_openai: Whether to use OpenAI API for intent detection
-        
     Returns:
-        Tuple (is_time_off_request: bool, confidence: float)
+        Tuple (result, confidence): result is the final (bool, float) answer
+        unless the OpenAI check applies to confidence, which then overrides it
     """
-    query_lower = query.lower()
-    
-    # First, check for explicit non-requests (questions about balance, history, etc.)
-    non_request_patterns = [
-        r'how many days',
-        r'how much (leave|time off|vacation)',
-        r'check my (leave|balance|time off)',
-        r'(leave|vacation|time off) balance',
-        r'days (remaining|left|available)',
-        r'did i take',
-        r'have i taken',
-        r'days i took',
-        r'time off history',
-        r'leave history',
-        r'show my (leave|time off)',
-        r'display my (leave|time off)',
-        r'list my (leave|time off)',
-        r'what is my (leave|vacation|time off)',
-        r'do i have (leave|vacation|time off)'
-    ]
+    # Chit-chat without a single trigger word skips every pattern below
+    if not _TIME_OFF_TRIGGER_RE.search(query_lower):
+        return (False, 0.0), 0.0
     
     # If it matches non-request patterns, it's definitely not a request
-    if any(re.search(pattern, query_lower) for pattern in non_request_patterns):
-        return False, 0.0
-    
-    # Expanded patterns for time-off requests
-    strong_request_patterns = [
-        # Direct requests
-        r'\b(i|I)(\s+would\s+like\s+to|\s+want\s+to|\s+need\s+to|\s+have\s+to|\s+must)?\s*(request|take|book|apply\s+for|get|have)\s+(some\s+)?(time\s*off|leave|vacation|holiday|pto|days?\s+off)\b',
-        r'\b(request|requesting|apply\s+for|applying\s+for)\s+(time\s*off|leave|vacation|holiday|pto)\b',
-        r'\b(take|taking|book|booking)\s+(time\s*off|leave|vacation|holiday|pto|days?\s+off)\b',
-        r'\b(need|want|would\s+like)\s+(time\s*off|leave|vacation|holiday|pto|days?\s+off)\b',
-        
-        # Casual expressions
-        r'\bi(\s+want\s+a|\s+need\s+a|\s+would\s+like\s+a)?\s*(vacation|holiday|break|day\s+off)\b',
-        r'\bgoing\s+on\s+(vacation|leave|holiday)\b',
-        r'\bi\'?m\s+(taking|planning)\s+(time\s*off|leave|vacation|holiday)\b',
-        r'\bi\'?ll\s+be\s+(taking|out|off|away)\b',
-        
-        # Future tense indicators
-        r'\bwill\s+be\s+(taking|out|off|away)\s+(on|from|between)\b',
-        r'\bplan(?:ning)?\s+to\s+(take|be)\s+(off|away|out)\b',
-        
-        # Permission requests
-        r'\b(can|may|could)\s+i\s+(take|have|get|request)\s+(time\s*off|leave|vacation|holiday|days?\s+off)\b',
-        r'\bis\s+it\s+(possible|okay|fine)\s+(?:for\s+me\s+)?to\s+(take|request|have)\s+(time\s*off|leave|vacation)\b',
-        
-        # Specific day requests
-        r'\b(sick|personal|annual|unpaid)\s+(day|leave|time\s*off)\b',
-        r'\bcall(?:ing)?\s+in\s+sick\b',
-        r'\bneed\s+.{0,20}\s+off\b',  # "need tomorrow off", "need next week off"
-        
-        # Informal variations
-        r'\btime\s*off\s+request\b',
-        r'\bleave\s+request\b',
-        r'\bpto\s+request\b',
-        r'\bout\s+of\s+office\b',
-        r'\bwon\'?t\s+be\s+(in|at\s+work|available)\b'
-    ]
-    
-    medium_confidence_patterns = [
-        # Less direct but still indicative
-        r'\b(vacation|holiday|leave)\s+(in|on|from|starting)\b',
-        r'\boff\s+(work|from\s+work)\s+(on|from)\b',
-        r'\bnot\s+(coming|be)\s+(in|to\s+work)\b',
-        r'\baway\s+from\s+(work|office)\b',
-        r'\btake\s+.{0,10}\s+off\b',  # "take Friday off"
-        r'\bneed\s+.{0,10}\s+for\s+(personal|family|medical)\b',
-        
-        # Single word triggers in certain contexts
-        r'\b(vacation|holiday|leave|pto|time\s*off)\b.*\b(date|when|tomorrow|next|this)\b',
-        r'\b(tomorrow|next\s+week|next\s+month|june|july)\b.*\b(off|vacation|leave)\b'
-    ]
-    
-    # Date-related patterns that suggest time off
-    date_patterns = [
-        r'\b(from|starting)\s+\d{1,2}[/-]\d{1,2}',
-        r'\b(on|for)\s+\d{1,2}[/-]\d{1,2}',
-        r'\b(june|july|august|september|october|november|december|january|february|march|april|may)\s+\d{1,2}',
-        r'\bnext\s+(monday|tuesday|wednesday|thursday|friday|week|month)',
-        r'\btomorrow\b',
-        r'\b\d+\s+days?\b'
-    ]
+    if _NON_REQUEST_RE.search(query_lower):
+        return (False, 0.0), 0.0
     
     # Calculate confidence based on pattern matches
     confidence = 0.0
     
     # Check strong patterns (high confidence)
-    strong_match_count = sum(1 for pattern in strong_request_patterns if re.search(pattern, query_lower))
-    if strong_match_count > 0:
-        confidence = min(0.9, 0.7 + (0.1 * strong_match_count))
-        return True, confidence
-    
-    # Check medium confidence patterns
-    medium_match_count = sum(1 for pattern in medium_confidence_patterns if re.search(pattern, query_lower))
-    date_match_count = sum(1 for pattern in date_patterns if re.search(pattern, query_lower))
-    
-    if medium_match_count > 0:
+    if _STRONG_REQUEST_RE.search(query_lower):
+        strong_match_count = _count_matching_patterns(_STRONG_REQUEST_RES, query_lower, _STRONG_MATCH_CAP)
+        return (True, min(0.9, 0.7 + (0.1 * strong_match_count))), 0.0
+    
+    # Check medium confidence patterns (date patterns only add to a medium match)
+    if _MEDIUM_CONFIDENCE_RE.search(query_lower):
+        medium_match_count = _count_matching_patterns(_MEDIUM_CONFIDENCE_RES, query_lower)
+        date_match_count = _count_matching_patterns(_DATE_RES, query_lower)
         confidence = 0.5 + (0.1 * medium_match_count) + (0.05 * date_match_count)
         if confidence >= 0.6:
-            return True, confidence
+            return (True, confidence), confidence
+    
+    # Context-aware detection: check for vacation-related words with temporal context
+    if _VACATION_WORDS_RE.search(query_lower) and _TEMPORAL_WORDS_RE.search(query_lower):
+        return (True, 0.5), confidence
+    
+    return (False, 0.0), confidence
+
+@cache
+def _openai_client():
+    """OpenAI client for intent detection (optional), created on first use only"""
+    from openai import OpenAI
+    return OpenAI(api_key=OPENAI_API_KEY)
+
+# Verdicts per normalized message (case and spacing variants share one); oldest dropped first
+_TIME_OFF_VERDICT_CACHE = {}
+_TIME_OFF_VERDICT_CACHE_SIZE = 1024
+
+def _openai_time_off_verdict(query):
+    """
+    Ask the OpenAI classifier whether a message requests time off.
+    The original text goes into the prompt; failures raise and are not cached.
+    """
+    query_key = ' '.join(query.lower().split())
+    if query_key in _TIME_OFF_VERDICT_CACHE:
+        return _TIME_OFF_VERDICT_CACHE[query_key]
+    
+    response = _openai_client().chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[
+            {
+                "role": "system",
+                "content": "You are an intent classifier. Determine if the user is requesting time off from work. Respond with only 'YES' or 'NO'."
+            },
+            {
+                "role": "user",
+                "content": f"Is this a request for time off/leave/vacation? Message: '{query}'"
+            }
+        ],
+        temperature=0,
+        max_tokens=1  # "YES" / "NO" are a single token each
+    )
+    ai_response = response.choices[0].message.content.strip().upper() if response.choices[0].message.content else ""
+    verdict = ai_response.startswith("YES")
+    
+    if len(_TIME_OFF_VERDICT_CACHE) >= _TIME_OFF_VERDICT_CACHE_SIZE:
+        _TIME_OFF_VERDICT_CACHE.pop(next(iter(_TIME_OFF_VERDICT_CACHE)), None)
+    _TIME_OFF_VERDICT_CACHE[query_key] = verdict
+    return verdict
+
+def detect_time_off_intent_nlp(query, use_openai=False):
+    """
+    Enhanced NLP-based detection of time-off intent
+    
+    Args:
+        query: User's message
+        use_openai: Whether to use OpenAI API for intent detection
+        
+    Returns:
+        Tuple (is_time_off_request: bool, confidence: float)
+    """
+    query_lower = query.lower()
+    result, confidence = _time_off_pattern_result(query_lower)
     
     # If OpenAI is enabled and we're still unsure, use it for verification
     if use_openai and confidence < 0.6 and confidence > 0.3:
         try:
-            from openai import OpenAI
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            response = client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an intent classifier. Determine if the user is requesting time off from work. Respond with only 'YES' or 'NO'."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Is this a request for time off/leave/vacation? Message: '{query}'"
-                    }
-                ],
-                temperature=0.1,
-                max_tokens=10
-            )
-            ai_response = response.choices[0].message.content.strip().upper() if response.choices[0].message.content else ""
-            if "YES" in ai_response:
+            if _openai_time_off_verdict(query):
                 return True, 0.7  # OpenAI confirmation gives moderate confidence
             else:
                 return False, 0.0
@@ -168,18 +252,7 @@ def detect_time_off_intent_nlp(query, use_openai=False):
             # If OpenAI fails, fall back to pattern matching result
             pass
     
-    # Context-aware detection: check for vacation-related words with temporal context
-    vacation_words = ['vacation', 'holiday', 'leave', 'off', 'away', 'pto', 'break']
-    temporal_words = ['tomorrow', 'next', 'this', 'from', 'to', 'between', 'on', 'starting', 'until']
-    
-    vacation_present = any(word in query_lower for word in vacation_words)
-    temporal_present = any(word in query_lower for word in temporal_words)
-    
-    if vacation_present and temporal_present:
-        confidence = 0.5
-        return True, confidence
-    
-    return False, 0.0
+    return result
 
 def detect_time_off_intent(query):
     """
@@ -209,7 +282,8 @@ def handle_employee_request(query, employee_data):
     General handler for all employee requests (time-off, templates, etc.).
     This function will route to the appropriate specific handler.
     """
-    st.session_state.active_workflow = 'employee_request'
+    if st.session_state.get('active_workflow') != 'employee_request':
+        st.session_state.active_workflow = 'employee_request'
     # Check for cancellation first
     if detect_exit_intent_multilingual(query):
         # Clear all relevant session states
@@ -224,50 +298,49 @@ def handle_employee_request(query, employee_data):
     if detect_leave_balance_intent(query):
         return format_leave_balance(employee_data)
 
-    # Check for time-off intent first
-    if detect_time_off_intent(query) or st.session_state.get('time_off_request', {}).get('step'):
+    # Check for time-off intent first (an ongoing step skips the detectors)
+    if st.session_state.get('time_off_request', {}).get('step') or detect_time_off_intent(query):
         return handle_time_off_request(query, employee_data)
     
     # Check for template request intent
-    if detect_template_intent(query) or st.session_state.get('template_request', {}).get('step'):
+    if st.session_state.get('template_request', {}).get('step') or detect_template_intent(query):
         return handle_template_request(query, employee_data)
         
     # Fallback if no specific intent is detected, but this function was called
     # Try to handle as time-off by default, as it's the most common request
     return handle_time_off_request(query, employee_data)
 
+_ISO_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+# Travel date formats tried in order; the parsers store ISO dates, which take the fast path
+_TRAVEL_DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d/%m')
+
+def _parse_travel_date(date_str):
+    """Datetime for a travel date string, or None if no known format matches"""
+    if _ISO_DATE_RE.fullmatch(date_str):
+        try:
+            return datetime(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:]))
+        except ValueError:
+            return None
+    
+    for fmt in _TRAVEL_DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(date_str, fmt)
+            if fmt == '%d/%m':  # Add current year if DD/MM format
+                parsed = parsed.replace(year=datetime.now().year)
+            return parsed
+        except:
+            continue
+    return None
+
 def validate_embassy_travel_duration(start_date_str, end_date_str):
     """
     Validate that embassy letter travel duration is not more than 14 days.
     Returns error message if invalid, None if valid.
     """
     try:
-        from datetime import datetime
-        
-        # Try multiple date formats
-        date_formats = ['%Y-%m-%d', '%d/%m/%Y', '%d/%m']
-        start_dt = None
-        end_dt = None
-        
-        # Parse start date
-        for fmt in date_formats:
-            try:
-                start_dt = datetime.strptime(start_date_str, fmt)
-                if fmt == '%d/%m':  # Add current year if DD/MM format
-                    start_dt = start_dt.replace(year=datetime.now().year)
-                break
-            except:
-                continue
-        
-        # Parse end date
-        for fmt in date_formats:
-            try:
-                end_dt = datetime.strptime(end_date_str, fmt)
-                if fmt == '%d/%m':  # Add current year if DD/MM format
-                    end_dt = end_dt.replace(year=datetime.now().year)
-                break
-            except:
-                continue
+        start_dt = _parse_travel_date(start_date_str)
+        end_dt = _parse_travel_date(end_date_str)
         
         if start_dt and end_dt:
             duration = (end_dt - start_dt).days
@@ -289,25 +362,43 @@ The P&C team will be able to assist you with longer duration employment letters
         # If date parsing fails, return None (let other validation handle it)
         return None
 
-def parse_single_date(date_str):
-    """Enhanced date parsing with support for DD/MM format, written dates, ordinal numbers, and misspellings"""
-    if not date_str:
-        return None
-    
-    # Clean the date string
-    date_str = date_str.strip().lower()
-    
-    # Remove common suffixes (st, nd, rd, th)
-    date_str = re.sub(r'(\d+)(st|nd|rd|th)', r'\1', date_str)
-    
-    # Handle "X of month" format (e.g., "13 of june" -> "13 june")
-    date_str = date_str.replace(' of ', ' ')
-    
-    # Get current date info
-    today = datetime.now()
-    current_year = today.year
-    
-    # Handle relative dates
+_ORDINAL_SUFFIX_RE = re.compile(r'(\d+)(st|nd|rd|th)')
+
+# DD/MM format (always DD/MM, not MM/DD), optional year
+_DD_MM_RE = re.compile(r'^(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?$')
+
+# Numeric dates with a consistent separator, field order decided by digit counts
+_NUMERIC_DATE_RE = re.compile(r'^(\d{1,4})([/-])(\d{1,2})\2(\d{1,4})$')
+
+# Enhanced month names mapping with common misspellings
+MONTHS = {
+    'january': 1, 'jan': 1, 'janu': 1,
+    'february': 2, 'feb': 2, 'febru': 2,
+    'march': 3, 'mar': 3,
+    'april': 4, 'apr': 4,
+    'may': 5,
+    'june': 6, 'jun': 6,
+    'july': 7, 'jul': 7,
+    'august': 8, 'aug': 8, 'agust': 8,  # Common misspelling
+    'september': 9, 'sep': 9, 'sept': 9,
+    'october': 10, 'oct': 10,
+    'november': 11, 'nov': 11,
+    'december': 12, 'dec': 12
+}
+
+# All month spellings in one alternation, longest first so "june" wins over "jun".
+# Matches "June 11" / "June 11, 2024" and "11 June" / "11 June 2024", leftmost first
+_MONTH_ALT = '|'.join(sorted(MONTHS, key=len, reverse=True))
+_YEAR_SUFFIX = r'(?:\s*,?\s*(?P<{}>\d{{4}}))?'
+_WRITTEN_DATE_RE = re.compile(
+    rf'(?P<month1>{_MONTH_ALT})\s+(?P<day1>\d{{1,2}}){_YEAR_SUFFIX.format("year1")}'
+    rf'|(?P<day2>\d{{1,2}})\s+(?P<month2>{_MONTH_ALT}){_YEAR_SUFFIX.format("year2")}'
+)
+
+@lru_cache(maxsize=2)
+def _relative_date_table(today_date):
+    """Relative day names -> ISO dates for one calendar day, checked in insertion order"""
+    today = today_date
     relative_dates = {
         'today': today,
         'tomorrow': today + timedelta(days=1),
@@ -327,31 +418,35 @@ def parse_single_date(date_str):
         'saturday': today + timedelta(days=(5 - today.weekday()) % 7),
         'sunday': today + timedelta(days=(6 - today.weekday()) % 7),
     }
+    return tuple((key, value.strftime('%Y-%m-%d')) for key, value in relative_dates.items())
+
+def parse_single_date(date_str):
+    """Enhanced date parsing with support for DD/MM format, written dates, ordinal numbers, and misspellings"""
+    if not date_str:
+        return None
+    
+    # Results only change with the calendar day, so they are cached per (text, day)
+    return _parse_single_date(date_str.strip().lower(), datetime.now().date())
+
+@lru_cache(maxsize=1024)
+def _parse_single_date(date_str, today_date):
+    # Remove common suffixes (st, nd, rd, th)
+    date_str = _ORDINAL_SUFFIX_RE.sub(r'\1', date_str)
+    
+    # Handle "X of month" format (e.g., "13 of june" -> "13 june")
+    date_str = date_str.replace(' of ', ' ')
+    
+    # Get current date info
+    today = datetime.now()
+    current_year = today.year
     
     # Check for relative dates
-    for key, value in relative_dates.items():
+    for key, value in _relative_date_table(today_date):
         if key in date_str:
-            return value.strftime('%Y-%m-%d')
-    
-    # Enhanced month names mapping with common misspellings
-    months = {
-        'january': 1, 'jan': 1, 'janu': 1,
-        'february': 2, 'feb': 2, 'febru': 2,
-        'march': 3, 'mar': 3,
-        'april': 4, 'apr': 4,
-        'may': 5,
-        'june': 6, 'jun': 6,
-        'july': 7, 'jul': 7,
-        'august': 8, 'aug': 8, 'agust': 8,  # Common misspelling
-        'september': 9, 'sep': 9, 'sept': 9,
-        'october': 10, 'oct': 10,
-        'november': 11, 'nov': 11,
-        'december': 12, 'dec': 12
-    }
+            return value
     
     # Try DD/MM format first (always assume DD/MM, not MM/DD)
-    dd_mm_pattern = r'^(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?$'
-    match = re.match(dd_mm_pattern, date_str)
+    match = _DD_MM_RE.match(date_str)
     if match:
         day, month, year = match.groups()
         day, month = int(day), int(month)
@@ -368,55 +463,118 @@ def parse_single_date(date_str):
         except ValueError:
             pass
     
-    # Try written month formats
-    for month_name, month_num in months.items():
-        # Pattern for "June 11", "11 June", "June 11, 2024", "11th June", "June 11th"
-        patterns = [
-            rf'{month_name}\s+(\d{{1,2}})(?:\s*,?\s*(\d{{4}}))?',  # June 11 or June 11, 2024
-            rf'(\d{{1,2}})\s+{month_name}(?:\s*,?\s*(\d{{4}}))?',  # 11 June or 11 June 2024
-        ]
+    # Try written month formats: "June 11", "11 June", "June 11, 2024", "11th June", "June 11th"
+    for match in _WRITTEN_DATE_RE.finditer(date_str):
+        month_name, day, year = (
+            match.group('month1', 'day1', 'year1') if match['month1']
+            else match.group('month2', 'day2', 'year2')
+        )
+        month_num = MONTHS[month_name]
+        day = int(day)
+        year = int(year) if year else current_year
         
-        for pattern in patterns:
-            match = re.search(pattern, date_str)
-            if match:
-                groups = match.groups()
-                if pattern.startswith(r'(\d'):  # Day comes first
-                    day = int(groups[0])
-                    year = int(groups[1]) if groups[1] else current_year
-                else:  # Month name comes first
-                    day = int(groups[0])
-                    year = int(groups[1]) if groups[1] else current_year
-                
-                try:
-                    parsed_date = datetime(year, month_num, day)
-                    # If the date is in the past for current year, assume next year
-                    if parsed_date < today and year == current_year:
-                        parsed_date = datetime(year + 1, month_num, day)
-                    return parsed_date.strftime('%Y-%m-%d')
-                except ValueError:
-                    continue
-    
-    # Try other standard formats as fallback
-    formats = [
-        '%Y-%m-%d', '%Y/%m/%d', '%d-%m-%Y', '%d/%m/%Y',
-        '%m-%d-%Y', '%m/%d/%Y', '%d-%m-%y', '%d/%m/%y'
-    ]
-    
-    for fmt in formats:
         try:
-            parsed = datetime.strptime(date_str, fmt)
-            # If year is not in the format, add current year
-            if '%Y' not in fmt and '%y' not in fmt:
-                parsed = parsed.replace(year=current_year)
-                # If the date is in the past, assume next year
-                if parsed < today:
-                    parsed = parsed.replace(year=current_year + 1)
-            return parsed.strftime('%Y-%m-%d')
-        except:
+            parsed_date = datetime(year, month_num, day)
+            # If the date is in the past for current year, assume next year
+            if parsed_date < today and year == current_year:
+                parsed_date = datetime(year + 1, month_num, day)
+            return parsed_date.strftime('%Y-%m-%d')
+        except ValueError:
             continue
     
+    # Numeric fallbacks, tried in order: YYYY-MM-DD, DD-MM-YYYY, MM-DD-YYYY, DD-MM-YY
+    # (same separator throughout, '-' or '/')
+    match = _NUMERIC_DATE_RE.match(date_str)
+    if match:
+        first, _, second, third = match.groups()
+        a, b, c = int(first), int(second), int(third)
+        if len(first) == 4 and len(third) <= 2:
+            candidates = ((a, b, c),)
+        elif len(first) <= 2 and len(third) == 4:
+            candidates = ((c, b, a), (c, a, b))
+        elif len(first) <= 2 and len(third) == 2:
+            # Two-digit years pivot like strptime's %y: 69-99 -> 19xx, 00-68 -> 20xx
+            candidates = ((c + 1900 if c >= 69 else c + 2000, b, a),)
+        else:
+            candidates = ()
+        
+        for year, month, day in candidates:
+            try:
+                return datetime(year, month, day).strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+    
     return None
 
+# Arabic leave type mapping
+ARABIC_LEAVE_TYPES = {
+    'سنوية': 'annual', 'إجازة سنوية': 'annual', 'اجازة سنوية': 'annual',
+    'مرضية': 'sick', 'إجازة مرضية': 'sick', 'اجازة مرضية': 'sick',
+    'بدون راتب': 'unpaid', 'إجازة بدون راتب': 'unpaid', 'اجازة بدون راتب': 'unpaid',
+    'شخصية': 'personal', 'إجازة شخصية': 'personal', 'اجازة شخصية': 'personal',
+    'عارضة': 'casual', 'إجازة عارضة': 'casual', 'اجازة عارضة': 'casual',
+}
+_ARABIC_LEAVE_TYPE_PRIORITY = tuple(dict.fromkeys(ARABIC_LEAVE_TYPES.values()))
+_ARABIC_LEAVE_TYPE_RE = re.compile(
+    '|'.join(map(re.escape, sorted(ARABIC_LEAVE_TYPES, key=len, reverse=True)))
+)
+
+# Single relative dates (tomorrow, today, etc.)
+SINGLE_RELATIVE_PATTERNS = [
+    r'\b(tomorrow|today|yesterday)\b',
+    r'\b(next\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday))\b',
+    r'\b(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b'
+]
+
+# Enhanced date range patterns
+DATE_RANGE_PATTERNS = [
+    # DD/MM to DD/MM format (e.g., "20/7 to 21/7", "20-7 to 21-7")
+    r'(?:from\s+)?(\d{1,2}[/-]\d{1,2})\s*(?:to|till|until|through|-|–)\s*(\d{1,2}[/-]\d{1,2})',
+    
+    # "X of month" format (e.g., "20th of july till the 21st of july", "20 of july to 21 of july")
+    r'(?:from\s+)?(\d{1,2}(?:st|nd|rd|th)?\s+of\s+\w+)\s*(?:to|till|until|through|-|–)\s*(?:the\s+)?(\d{1,2}(?:st|nd|rd|th)?\s+of\s+\w+)',
+    
+    # Written month formats (e.g., "august 2nd till august 9th", "august 2 to august 9")
+    r'(?:from\s+)?(\w+\s+\d{1,2}(?:st|nd|rd|th)?)\s*(?:to|till|until|through|-|–)\s*(\w+\s+\d{1,2}(?:st|nd|rd|th)?)',
+    
+    # Mixed formats (e.g., "august 2nd to 9th", "20/7 to august 9th")
+    r'(?:from\s+)?(\w+\s+\d{1,2}(?:st|nd|rd|th)?)\s*(?:to|till|until|through|-|–)\s*(\d{1,2}(?:st|nd|rd|th)?)',
+    r'(?:from\s+)?(\d{1,2}[/-]\d{1,2})\s*(?:to|till|until|through|-|–)\s*(\w+\s+\d{1,2}(?:st|nd|rd|th)?)',
+    
+    # Day only ranges (e.g., "2nd to 9th august", "20 to 21 july")
+    r'(?:from\s+)?(\d{1,2}(?:st|nd|rd|th)?)\s*(?:to|till|until|through|-|–)\s*(\d{1,2}(?:st|nd|rd|th)?)\s+(\w+)',
+]
+
+# Single date fallback
+SINGLE_DATE_PATTERNS = [
+    r'(\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?)',  # DD/MM or DD/MM/YYYY
+    r'(\w+\s+\d{1,2}(?:st|nd|rd|th)?)',  # Month Day
+    r'(\d{1,2}(?:st|nd|rd|th)?\s+\w+)',  # Day Month
+    r'(\d{1,2}(?:st|nd|rd|th)?\s+of\s+\w+)',  # X of month (e.g., "20th of july")
+]
+
+_SINGLE_RELATIVE_RES = tuple(re.compile(p, re.IGNORECASE) for p in SINGLE_RELATIVE_PATTERNS)
+_DATE_RANGE_RES = tuple(re.compile(p, re.IGNORECASE) for p in DATE_RANGE_PATTERNS)
+_SINGLE_DATE_RES = tuple(re.compile(p, re.IGNORECASE) for p in SINGLE_DATE_PATTERNS)
+
+# Every range pattern needs one of these connectors, so text without any skips them all
+_RANGE_CONNECTOR_RE = re.compile(r'to|till|until|through|-|–', re.IGNORECASE)
+
+class _NoDebugSteps:
+    """Stand-in for the debug step list when debug mode is off"""
+    __slots__ = ()
+    
+    def append(self, step):
+        pass
+
+_NO_DEBUG_LOG = {'steps': _NoDebugSteps()}
+
+def _record_date_parsing(details, debug_log):
+    """Publish the date-parsing trace for the debug panel, then hand back details"""
+    if debug_log is not _NO_DEBUG_LOG:
+        st.session_state.debug_info['date_parsing'] = debug_log
+    return details
+
 def parse_time_off_details(query):
     """
     Enhanced time-off details parsing with improved date range detection
@@ -429,19 +587,16 @@ def parse_time_off_details(query):
         'description': None
     }
     query_lower = query.lower()
-    debug_log = {'input': query, 'steps': []}
-    
-    # Arabic leave type mapping
-    arabic_leave_types = {
-        'سنوية': 'annual', 'إجازة سنوية': 'annual', 'اجازة سنوية': 'annual',
-        'مرضية': 'sick', 'إجازة مرضية': 'sick', 'اجازة مرضية': 'sick',
-        'بدون راتب': 'unpaid', 'إجازة بدون راتب': 'unpaid', 'اجازة بدون راتب': 'unpaid',
-        'شخصية': 'personal', 'إجازة شخصية': 'personal', 'اجازة شخصية': 'personal',
-        'عارضة': 'casual', 'إجازة عارضة': 'casual', 'اجازة عارضة': 'casual',
-    }
+    # Parsing steps are only collected while debug mode is on
+    if st.session_state.get('show_debug', False):
+        debug_log = {'input': query, 'steps': []}
+    else:
+        debug_log = _NO_DEBUG_LOG
     
-    for ar, en in arabic_leave_types.items():
-        if ar in query:
+    # Arabic leave type (if several appear, the earliest in ARABIC_LEAVE_TYPES wins)
+    found_types = {ARABIC_LEAVE_TYPES[ar] for ar in _ARABIC_LEAVE_TYPE_RE.findall(query)}
+    for en in _ARABIC_LEAVE_TYPE_PRIORITY:
+        if en in found_types:
             details['leave_type'] = en
             debug_log['steps'].append({'arabic_leave_type': en})
             break
@@ -457,26 +612,20 @@ def parse_time_off_details(query):
             details['leave_type'] = 'unpaid'
     
     # Handle Arabic dates
-    is_arabic = any('\u0600' <= c <= '\u06FF' for c in query)
+    is_arabic = contains_arabic(query)
     if is_arabic:
         date = parse_arabic_date(query)
         if date:
             details['date_from'] = date
             details['date_to'] = date
             debug_log['steps'].append({'arabic_date': date})
-            st.session_state.debug_info['date_parsing'] = debug_log
-            return details
-        query = convert_arabic_numerals(query)
+            return _record_date_parsing(details, debug_log)
+        # The date patterns below all run on query_lower
+        query_lower = convert_arabic_numerals(query_lower)
     
     # First, check for single relative dates (tomorrow, today, etc.)
-    single_relative_patterns = [
-        r'\b(tomorrow|today|yesterday)\b',
-        r'\b(next\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday))\b',
-        r'\b(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b'
-    ]
-    
-    for pattern in single_relative_patterns:
-        match = re.search(pattern, query_lower, re.IGNORECASE)
+    for pattern in _SINGLE_RELATIVE_RES:
+        match = pattern.search(query_lower)
         if match:
             date_str = match.group(1).strip()
             parsed_date = parse_single_date(date_str)
@@ -484,30 +633,12 @@ def parse_time_off_details(query):
                 details['date_from'] = parsed_date
                 details['date_to'] = parsed_date
                 debug_log['steps'].append({'single_relative_date': parsed_date})
-                st.session_state.debug_info['date_parsing'] = debug_log
-                return details
+                return _record_date_parsing(details, debug_log)
     
-    # Enhanced date range patterns
-    date_range_patterns = [
-        # DD/MM to DD/MM format (e.g., "20/7 to 21/7", "20-7 to 21-7")
-        r'(?:from\s+)?(\d{1,2}[/-]\d{1,2})\s*(?:to|till|until|through|-|–)\s*(\d{1,2}[/-]\d{1,2})',
-        
-        # "X of month" format (e.g., "20th of july till the 21st of july", "20 of july to 21 of july")
-        r'(?:from\s+)?(\d{1,2}(?:st|nd|rd|th)?\s+of\s+\w+)\s*(?:to|till|until|through|-|–)\s*(?:the\s+)?(\d{1,2}(?:st|nd|rd|th)?\s+of\s+\w+)',
-        
-        # Written month formats (e.g., "august 2nd till august 9th", "august 2 to august 9")
-        r'(?:from\s+)?(\w+\s+\d{1,2}(?:st|nd|rd|th)?)\s*(?:to|till|until|through|-|–)\s*(\w+\s+\d{1,2}(?:st|nd|rd|th)?)',
-        
-        # Mixed formats (e.g., "august 2nd to 9th", "20/7 to august 9th")
-        r'(?:from\s+)?(\w+\s+\d{1,2}(?:st|nd|rd|th)?)\s*(?:to|till|until|through|-|–)\s*(\d{1,2}(?:st|nd|rd|th)?)',
-        r'(?:from\s+)?(\d{1,2}[/-]\d{1,2})\s*(?:to|till|until|through|-|–)\s*(\w+\s+\d{1,2}(?:st|nd|rd|th)?)',
-        
-        # Day only ranges (e.g., "2nd to 9th august", "20 to 21 july")
-        r'(?:from\s+)?(\d{1,2}(?:st|nd|rd|th)?)\s*(?:to|till|until|through|-|–)\s*(\d{1,2}(?:st|nd|rd|th)?)\s+(\w+)',
-    ]
-    
-    for pattern in date_range_patterns:
-        match = re.search(pattern, query_lower, re.IGNORECASE)
+    # Enhanced date range patterns (none can match without a range connector)
+    range_patterns = _DATE_RANGE_RES if _RANGE_CONNECTOR_RE.search(query_lower) else ()
+    for pattern in range_patterns:
+        match = pattern.search(query_lower)
         if match:
             groups = match.groups()
             date_from_str = groups[0].strip()
@@ -519,7 +650,7 @@ def parse_time_off_details(query):
                 date_from_str = f"{date_from_str} {month}"
                 date_to_str = f"{date_to_str} {month}"
             
-            debug_log['steps'].append({'matched_pattern': pattern, 'groups': [date_from_str, date_to_str]})
+            debug_log['steps'].append({'matched_pattern': pattern.pattern, 'groups': [date_from_str, date_to_str]})
             
             parsed_from = parse_single_date(date_from_str)
             parsed_to = parse_single_date(date_to_str)
@@ -529,21 +660,13 @@ def parse_time_off_details(query):
             if parsed_from and parsed_to:
                 details['date_from'] = parsed_from
                 details['date_to'] = parsed_to
-                st.session_state.debug_info['date_parsing'] = debug_log
-                return details
+                return _record_date_parsing(details, debug_log)
             else:
                 debug_log['steps'].append({'range_parse_failed': True})
     
     # Single date fallback
-    single_date_patterns = [
-        r'(\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?)',  # DD/MM or DD/MM/YYYY
-        r'(\w+\s+\d{1,2}(?:st|nd|rd|th)?)',  # Month Day
-        r'(\d{1,2}(?:st|nd|rd|th)?\s+\w+)',  # Day Month
-        r'(\d{1,2}(?:st|nd|rd|th)?\s+of\s+\w+)',  # X of month (e.g., "20th of july")
-    ]
-    
-    for pattern in single_date_patterns:
-        match = re.search(pattern, query_lower, re.IGNORECASE)
+    for pattern in _SINGLE_DATE_RES:
+        match = pattern.search(query_lower)
         if match:
             date_str = match.group(1).strip()
             parsed_date = parse_single_date(date_str)
@@ -551,46 +674,24 @@ def parse_time_off_details(query):
                 details['date_from'] = parsed_date
                 details['date_to'] = parsed_date
                 debug_log['steps'].append({'single_date': parsed_date})
-                st.session_state.debug_info['date_parsing'] = debug_log
-                return details
+                return _record_date_parsing(details, debug_log)
     
-    st.session_state.debug_info['date_parsing'] = debug_log
-    return details
+    return _record_date_parsing(details, debug_log)
 
-def handle_time_off_request(query, employee_data):
+LEAVE_TYPE_MAP_TTL = 300  # seconds
+
+# Shown in the leave type prompt when Odoo returned no leave types
+DEFAULT_LEAVE_TYPE_LIST = "- Annual Leave\n- Sick Leave\n- Unpaid Leave"
+
+def _get_leave_type_map():
     """
-    Handle the time-off request flow
-    
-    Args:
-        query: User's message
-        employee_data: Employee data dictionary
-        
-    Returns:
-        Response message
+    Return (filtered_leave_types, leave_type_map) for the time-off flow.
+    Built from Odoo at most once per LEAVE_TYPE_MAP_TTL per session, so
+    each turn of a multi-turn request doesn't refetch and rebuild it.
     """
-    # Check if we have pending time-off request in session
-    if 'time_off_request' not in st.session_state:
-        st.session_state.time_off_request = {}
-    
-    request_data = st.session_state.time_off_request
-    employee_id = employee_data.get('id')
-    
-    # If this is a new request, try to parse details from the query
-    if not request_data:
-        parsed_details = parse_time_off_details(query)
-        request_data.update(parsed_details)
-
-    # If dates are missing, try to parse them from the current input
-    if (not request_data.get('date_from') or not request_data.get('date_to')):
-        parsed_details = parse_time_off_details(query)
-        # Only update if the fields are missing and the parser found them
-        if not request_data.get('date_from') and parsed_details.get('date_from'):
-            request_data['date_from'] = parsed_details['date_from']
-        if not request_data.get('date_to') and parsed_details.get('date_to'):
-            request_data['date_to'] = parsed_details['date_to']
-    
-    # Check what information we still need
-    missing_info = []
+    cached = st.session_state.get('_leave_type_map')
+    if cached and st.session_state.get('_leave_type_map_ts', 0) > time.time() - LEAVE_TYPE_MAP_TTL:
+        return cached
     
     # Get available leave types
     leave_types = get_available_leave_types()
@@ -632,11 +733,50 @@ def handle_time_off_request(query, employee_data):
             leave_type_map['unpaid leave'] = lt
             leave_type_map['lwop'] = lt
     
+    # Don't hold on to an empty result (e.g. Odoo was unreachable)
+    if leave_types:
+        st.session_state._leave_type_map = (filtered_leave_types, leave_type_map)
+        st.session_state._leave_type_map_ts = time.time()
+    return filtered_leave_types, leave_type_map
+
+def handle_time_off_request(query, employee_data):
+    """
+    Handle the time-off request flow
+    
+    Args:
+        query: User's message
+        employee_data: Employee data dictionary
+        
+    Returns:
+        Response message
+    """
+    # Pending time-off request for this session (updated in place)
+    request_data = st.session_state.setdefault('time_off_request', {})
+    employee_id = employee_data.get('id')
+    
+    # Parse the query at most once: a new request takes everything the parser
+    # found, a continuation only fills in dates that are still missing
+    if not request_data:
+        request_data.update(parse_time_off_details(query))
+    elif (not request_data.get('date_from') or not request_data.get('date_to')):
+        parsed_details = parse_time_off_details(query)
+        # Only update if the fields are missing and the parser found them
+        if not request_data.get('date_from') and parsed_details.get('date_from'):
+            request_data['date_from'] = parsed_details['date_from']
+        if not request_data.get('date_to') and parsed_details.get('date_to'):
+            request_data['date_to'] = parsed_details['date_to']
+    
+    # Check what information we still need
+    missing_info = []
+    
+    # Leave types and their lookup keys (cached per session, see _get_leave_type_map)
+    filtered_leave_types, leave_type_map = _get_leave_type_map()
+    
     # Check leave type
     if not request_data.get('leave_type_id'):
         # Try to match user input with leave types
         query_lower = query.lower().strip()
-        is_arabic = any('\u0600' <= c <= '\u06FF' for c in query)
+        is_arabic = contains_arabic(query)
         # First check if the query matches any leave type directly
         if query_lower in leave_type_map:
             lt = leave_type_map[query_lower]
@@ -675,17 +815,17 @@ def handle_time_off_request(query, employee_data):
     if not request_data.get('date_to'):
         missing_info.append('date_to')
     
-    # Store the updated request data
-    st.session_state.time_off_request = request_data
+    # request_data is st.session_state.time_off_request itself, updated in place above
     
-    # Debug logging
-    if 'debug_info' not in st.session_state:
-        st.session_state.debug_info = {}
-    st.session_state.debug_info['time_off_request'] = {
-        'current_state': request_data,
-        'missing_info': missing_info,
-        'query': query
-    }
+    # Debug logging (only read by the debug panel)
+    if st.session_state.get('show_debug', False):
+        if 'debug_info' not in st.session_state:
+            st.session_state.debug_info = {}
+        st.session_state.debug_info['time_off_request'] = {
+            'current_state': request_data,
+            'missing_info': missing_info,
+            'query': query
+        }
     
     # Add exit/cancel detection for Arabic
     if detect_exit_intent_multilingual(query):
@@ -770,11 +910,9 @@ Please check the dates and try again, or contact HR for assistance.
     
     # If we need more information, ask for it
     else:
-        is_arabic = any('\u0600' <= c <= '\u06FF' for c in query)
+        is_arabic = contains_arabic(query)
         if 'leave_type' in missing_info:
-            leave_type_list = "\n".join([f"- {lt['name']}" for lt in filtered_leave_types])
-            if not filtered_leave_types:
-                leave_type_list = "- Annual Leave\n- Sick Leave\n- Unpaid Leave"
+            leave_type_list = "\n".join(f"- {lt['name']}" for lt in filtered_leave_types) or DEFAULT_LEAVE_TYPE_LIST
             if is_arabic:
                 return f"""يرجى تحديد نوع الإجازة التي ترغب بها (على سبيل المثال: إجازة سنوية، إجازة مرضية، إجازة بدون راتب):\n\n{leave_type_list}\n\nاكتب نوع الإجازة أدناه.\n\n💡 اكتب 'إلغاء' في أي وقت للخروج من هذه العملية."""
             else:
@@ -785,6 +923,63 @@ Please check the dates and try again, or contact HR for assistance.
             else:
                 return f"Great! You want to request {request_data.get('leave_type_name', 'time off')}. \n\nNow, please provide the dates:\n- What date would you like to start your time off?\n- What date would you like to return?\n\nYou can say something like:\n- \"from 15/3 to 17/3\"\n- \"15/3 to 17/3\"  \n- \"from March 15 to March 17\"\n- \"tomorrow\" (for a single day)\n- \"from June 1st till the 2nd\"\n- \"13 of june till 14th\"\n- \"next Monday to Friday\"\n\nPlease provide your dates.\n\n💡 *Type \"cancel\" at any time to exit this process.*"
 
+# Employment letter language, in priority order: a language name anywhere in the
+# message wins over a bare "2"/"1" answer to the prompt. Each alternative is a
+# lookahead at the start, so the first one that occurs decides (lastgroup).
+# 'عربي' also covers 'عربية'/'بالعربية', 'انجليزي' also covers 'بالانجليزي'
+_EMPLOYMENT_LETTER_LANGUAGE_RE = re.compile(
+    r'(?=.*?(?:arabic|عربي))(?P<arabic>)'
+    r'|(?=.*?(?:english|انجليزي))(?P<english>)'
+    r'|(?=.*?2)(?P<arabic_choice>)'
+    r'|(?=.*?1)(?P<english_choice>)',
+    re.DOTALL
+)
+_EMPLOYMENT_LETTER_LANGUAGES = {
+    'arabic': 'employment_letter_arabic',
+    'english': 'employment_letter',
+    'arabic_choice': 'employment_letter_arabic',
+    'english_choice': 'employment_letter',
+}
+
+# TEMPLATE_OPTIONS is static, so the "which template?" reply is built once at import
+_TEMPLATE_LIST = "\n".join(f"- **{info['name']}**: {info['description']}" for info in TEMPLATE_OPTIONS.values())
+_TEMPLATE_OPTIONS_MESSAGE = f"""I can help you generate various employment documents. Here are the available templates:
+
+{_TEMPLATE_LIST}
+
+Which type of document would you like me to generate for you?
+
+You can ask for:
+- "Employment letter" (standard English version)
+- "Employment letter in Arabic"
+- "Embassy letter for [country name]"
+- "Experience certificate"
+
+Just let me know which one you need!
+
+💡 *Type "cancel" to exit this process.*"""
+
+# Embassy letter prompt for the destination country, with the first few COUNTRIES as examples
+_EMBASSY_COUNTRY_PROMPT = f"""I'll help you generate an employment letter for embassy/visa purposes. 
+
+Which country are you traveling to? Please specify the country name.
+
+Some examples: {", ".join(COUNTRIES[:10])}...
+
+💡 *Type "cancel" to exit this process.*"""
+
+# Closing paragraph of the "document generated" reply
+_TEMPLATE_READY_FOOTER = """
+The document has been prepared and is ready for download. Click the download button below to save it.
+
+**Note:** Please print the employment letter and get it signed by the P&C team!"""
+
+# Download button label per template type (employment letters use the default)
+_TEMPLATE_DOWNLOAD_TEXT = {
+    'employment_letter_embassy': "Download Embassy Letter",
+    'experience_letter': "Download Experience Letter",
+}
+
 def handle_template_request(query, employee_data):
     """
     Handle template generation requests (Arabic or English intent)
@@ -796,21 +991,21 @@ def handle_template_request(query, employee_data):
     Returns:
         Response message
     """
+    session = st.session_state
+    
     # Allow cancel/exit at any time (English/Arabic)
     if detect_exit_intent_multilingual(query):
-        st.session_state.template_request = {}
-        st.session_state.active_workflow = None
+        session.template_request = {}
+        session.active_workflow = None
         return "✅ The process has been cancelled. How else can I help you?"
 
-    # Check if we have pending template request in session
-    if 'template_request' not in st.session_state:
-        st.session_state.template_request = {}
-    
-    request_data = st.session_state.template_request
+    # Pending template request for this session; request_data is that dict and
+    # is updated in place, so it never has to be written back
+    request_data = session.setdefault('template_request', {})
 
     # Mark this as the active workflow to enable global cancel handling
-    if st.session_state.get('active_workflow') != 'template_request':
-        st.session_state.active_workflow = 'template_request'
+    if session.get('active_workflow') != 'template_request':
+        session.active_workflow = 'template_request'
     
     # Detect template type if not already set
     if not request_data.get('template_type'):
@@ -820,26 +1015,14 @@ def handle_template_request(query, employee_data):
     
     # Language selection for employment letters
     if request_data.get('template_type') == 'employment_letter' and not request_data.get('language_selected'):
-        # Check if user specified language in their request
-        query_lower = query.lower()
-        if any(word in query_lower for word in ['arabic', 'عربي', 'بالعربية', 'عربية']):
-            request_data['template_type'] = 'employment_letter_arabic'
-            request_data['language_selected'] = True
-        elif any(word in query_lower for word in ['english', 'انجليزي', 'بالانجليزي']):
-            request_data['template_type'] = 'employment_letter'
+        # Check if user specified language in their request (or answered the prompt with 1/2)
+        language = _EMPLOYMENT_LETTER_LANGUAGE_RE.match(query.lower())
+        if language:
+            request_data['template_type'] = _EMPLOYMENT_LETTER_LANGUAGES[language.lastgroup]
             request_data['language_selected'] = True
         else:
-            # Check if this is a response to the language prompt
-            if any(word in query_lower for word in ['arabic', 'عربي', 'بالعربية', 'عربية', '2', 'arabic']):
-                request_data['template_type'] = 'employment_letter_arabic'
-                request_data['language_selected'] = True
-            elif any(word in query_lower for word in ['english', 'انجليزي', 'بالانجليزي', '1', 'english']):
-                request_data['template_type'] = 'employment_letter'
-                request_data['language_selected'] = True
-            else:
-                # Ask for language preference
-                st.session_state.template_request = request_data
-                return """I'll help you generate an employment letter!
+            # Ask for language preference
+            return """I'll help you generate an employment letter!
 
 Which language would you prefer?
 
@@ -877,29 +1060,19 @@ Please type "English" or "Arabic" to continue.
         if not embassy_details.get('end_date'):
             missing_info.append('end_date')
         
-        # Store updated request data
-        st.session_state.template_request = request_data
-        
         # ALWAYS validate travel duration if we have both dates (regardless of how we got them)
         if embassy_details.get('start_date') and embassy_details.get('end_date'):
             validation_result = validate_embassy_travel_duration(embassy_details['start_date'], embassy_details['end_date'])
             if validation_result:
                 # Clear the request data and return error
-                st.session_state.template_request = {}
-                st.session_state.active_workflow = None
+                session.template_request = {}
+                session.active_workflow = None
                 return validation_result
         
         if missing_info:
             if 'country' in missing_info:
                 # Show country selection
-                countries_list = ", ".join(COUNTRIES[:10]) + "..."
-                return f"""I'll help you generate an employment letter for embassy/visa purposes. 
-
-Which country are you traveling to? Please specify the country name.
-
-Some examples: {countries_list}
-
-💡 *Type "cancel" to exit this process.*"""
+                return _EMBASSY_COUNTRY_PROMPT
             
             elif 'start_date' in missing_info or 'end_date' in missing_info:
                 # Try to parse dates one more time
@@ -909,9 +1082,6 @@ Some examples: {countries_list}
                 if parsed_dates.get('date_to'):
                     request_data['embassy_details']['end_date'] = parsed_dates['date_to']
                 
-                # Update session state
-                st.session_state.template_request = request_data
-                
                 # Check again if we have all info now
                 embassy_details = request_data.get('embassy_details', {})
                 if not (embassy_details.get('start_date') and embassy_details.get('end_date')):
@@ -935,14 +1105,14 @@ You can say something like "from 15 March to 25 March" or "15/3 to 25/3".
         result = generate_template(template_type, employee_data, embassy_details)
         
         # Clear the request data
-        st.session_state.template_request = {}
-        st.session_state.active_workflow = None
+        session.template_request = {}
+        session.active_workflow = None
         
         if result:
             doc_bytes, filename = result
             # Store in session state for download
-            st.session_state['template_bytes'] = doc_bytes
-            st.session_state['template_filename'] = filename
+            session['template_bytes'] = doc_bytes
+            session['template_filename'] = filename
             template_info = TEMPLATE_OPTIONS.get(template_type, {})
             
             # Track the activity
@@ -951,11 +1121,13 @@ You can say something like "from 15 March to 25 March" or "15/3 to 25/3".
                 details={'filename': filename, 'employee': employee_data.get('name')}
             )
             
-            response = f"""✅ I've generated your {template_info.get('name', 'document')}!
-
-📄 **Document Details:**
-- Employee: {employee_data.get('name')}
-- Type: {template_info.get('description', 'Employment document')}"""
+            parts = [
+                f"✅ I've generated your {template_info.get('name', 'document')}!",
+                "",
+                "📄 **Document Details:**",
+                f"- Employee: {employee_data.get('name')}",
+                f"- Type: {template_info.get('description', 'Employment document')}",
+            ]
             if embassy_details:
                 # Format dates as DD/MM for consistency with embassy letter template
                 start_date = embassy_details.get('start_date', '')
@@ -963,36 +1135,30 @@ You can say something like "from 15 March to 25 March" or "15/3 to 25/3".
                 
                 # Convert from ISO format (YYYY-MM-DD) to DD/MM if needed
                 try:
-                    from datetime import datetime
                     if start_date and len(start_date) == 10:  # YYYY-MM-DD format
-                        start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-                        start_date = start_dt.strftime('%d/%m')
+                        start_date = datetime.strptime(start_date, '%Y-%m-%d').strftime('%d/%m')
                     if end_date and len(end_date) == 10:  # YYYY-MM-DD format
-                        end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-                        end_date = end_dt.strftime('%d/%m')
+                        end_date = datetime.strptime(end_date, '%Y-%m-%d').strftime('%d/%m')
                 except:
                     pass  # Keep original format if conversion fails
                 
-                response += f"""
-- Country: {embassy_details.get('country')}
-- Travel dates: {start_date} to {end_date}"""
-            response += f"""
-
-The document has been prepared and is ready for download. Click the download button below to save it.
-
-**Note:** Please print the employment letter and get it signed by the P&C team!"""
+                parts += [
+                    f"- Country: {embassy_details.get('country')}",
+                    f"- Travel dates: {start_date} to {end_date}",
+                ]
+            parts.append(_TEMPLATE_READY_FOOTER)
+            response = "\n".join(parts)
+            
             # Add both messages to chat history
-            download_text = "Download Employment Letter"
-            if template_type == 'employment_letter_embassy':
-                download_text = "Download Embassy Letter"
-            elif template_type == 'experience_letter':
-                download_text = "Download Experience Letter"
-            st.session_state.messages.append({"role": "assistant", "content": response})
-            st.session_state.messages.append({"role": "assistant", "content": f"[DOWNLOAD_LINK|{download_text}]"})
+            download_text = _TEMPLATE_DOWNLOAD_TEXT.get(template_type, "Download Employment Letter")
+            session.messages.extend((
+                {"role": "assistant", "content": response},
+                {"role": "assistant", "content": f"[DOWNLOAD_LINK|{download_text}]"},
+            ))
             return None
         else:
             # Check debug info for error details
-            debug_info = st.session_state.get('debug_info', {})
+            debug_info = session.get('debug_info', {})
             template_error = debug_info.get('template_error', 'Unknown error')
             
             return f"""❌ I'm sorry, I couldn't generate the template. 
@@ -1012,173 +1178,138 @@ Or contact IT support for assistance.
     
     # If no specific template detected, show options
     else:
-        template_list = "\n".join([f"- **{info['name']}**: {info['description']}" for info in TEMPLATE_OPTIONS.values()])
-        
-        return f"""I can help you generate various employment documents. Here are the available templates:
-
-{template_list}
+        return _TEMPLATE_OPTIONS_MESSAGE
 
-Which type of document would you like me to generate for you?
+# Regex patterns for flexible matching - made more specific for balance requests
+LEAVE_BALANCE_PATTERNS = [
+    r'can (i|you) (get|show|give|see|tell).*\b(leave|time off|vacation|sick)\b.*\b(balance|summary|report|status|entitlement)\b',
+    r'how (many|much).*\b(leave|time off|vacation|sick)\b.*(do i have|left|remaining|available)',
+    r'how many days.*(left|remaining|available|do i have)',  # More general pattern for day counts
+    r'what is my (leave|time off|vacation|sick) (balance|status|entitlement)',
+    r'(leave|time off|vacation|sick) (balance|summary|report|status|entitlement)',
+    r'(show|display|list)\s+(my\s+)?(leave|time off|vacation|sick)\s*(balance|summary|history|days|entitlement)',
+    r'(leave|time off|vacation|sick).*\b(history|taken|used|remaining|left|available)\b',
+    
+    # Patterns for planned/scheduled time off variations
+    r'\b(planned|scheduled|upcoming|future)\s+(off\s+days?|time\s+off|leave|vacation|holidays?)\b',
+    r'\b(off\s+days?|time\s+off|leave|vacation|holidays?)\s+(planned|scheduled|upcoming|coming\s+up)\b',
+    r'\bwhat.*\b(planned|scheduled|upcoming)\b.*(off|leave|vacation|time\s+off)\b',
+    r'\b(show|display|list|tell).*\b(planned|scheduled|upcoming)\b.*(off|leave|vacation|time\s+off)\b',
+    r'\bdo\s+i\s+have.*\b(planned|scheduled|upcoming)\b.*(off|leave|vacation|time\s+off)\b',
+    r'\bany.*\b(planned|scheduled|upcoming)\b.*(off\s+days?|time\s+off|leave|vacation)\b',
+    r'\bmy.*\b(planned|scheduled|upcoming)\b.*(off\s+days?|time\s+off|leave|vacation)\b',
+    r'\bwhen.*\b(am\s+i|will\s+i\s+be)\b.*(off|on\s+leave|on\s+vacation)\b',
+    r'\bdays?\s+(i\s+have\s+)?(planned|scheduled|booked|coming\s+up)\b',
+    r'\btime\s+off.*\b(planned|scheduled|booked|coming\s+up)\b',
+    r'\b(scheduled|planned)\s+(days?\s+off|time\s+off)\b'
+]
 
-You can ask for:
-- "Employment letter" (standard English version)
-- "Employment letter in Arabic"
-- "Embassy letter for [country name]"
-- "Experience certificate"
-
-Just let me know which one you need!
+# Direct keyword/phrase matches, also the targets for fuzzy matching
+BALANCE_KEYWORDS = (
+    'leave balance', 'time off balance', 'vacation balance', 'sick balance',
+    'check my leave balance', 'check my balance', 'check my time off balance',
+    'days remaining', 'days left', 'days available',
+    'did i take', 'have i taken', 'days i took',
+    'time off history', 'leave history',
+    'show my leave balance', 'display my leave balance', 'list my leave balance',
+    'what is my leave balance', 'do i have leave remaining', 'do i have time off left',
+    'leave summary', 'leave report', 'leave status', 'leave entitlement',
+    'allocated leaves', 'allocated leave'
+)
 
-💡 *Type "cancel" to exit this process.*"""
-
-    # Add exit/cancel detection for Arabic
-    if detect_exit_intent_multilingual(query):
-        st.session_state.template_request = {}
-        st.session_state.active_workflow = None
-        return "تم إلغاء عملية إنشاء المستند. يمكنك البدء من جديد أو طلب مساعدة أخرى."
+# Keywords and patterns in one alternation, so exact matches take a single scan
+_LEAVE_BALANCE_RE = _union_regex([*map(re.escape, BALANCE_KEYWORDS), *LEAVE_BALANCE_PATTERNS])
 
+@lru_cache(maxsize=512)
 def detect_leave_balance_intent(query):
     """
     Detect if the user is asking for their leave balance or history.
     Returns True if the query is about leave balance, False otherwise.
     Uses regex and fuzzy matching for robust detection.
     """
-    import re
-    from rapidfuzz import fuzz
     query_lower = query.lower().strip()
-    # Direct keyword/phrase matches
-    balance_keywords = [
-        'leave balance', 'time off balance', 'vacation balance', 'sick balance',
-        'check my leave balance', 'check my balance', 'check my time off balance',
-        'days remaining', 'days left', 'days available',
-        'did i take', 'have i taken', 'days i took',
-        'time off history', 'leave history',
-        'show my leave balance', 'display my leave balance', 'list my leave balance',
-        'what is my leave balance', 'do i have leave remaining', 'do i have time off left',
-        'leave summary', 'leave report', 'leave status', 'leave entitlement',
-        'allocated leaves', 'allocated leave'
-    ]
-    for k in balance_keywords:
-        if k in query_lower:
-            return True
-    # Regex patterns for flexible matching - made more specific for balance requests
-    patterns = [
-        r'can (i|you) (get|show|give|see|tell).*\b(leave|time off|vacation|sick)\b.*\b(balance|summary|report|status|entitlement)\b',
-        r'how (many|much).*\b(leave|time off|vacation|sick)\b.*(do i have|left|remaining|available)',
-        r'how many days.*(left|remaining|available|do i have)',  # More general pattern for day counts
-        r'what is my (leave|time off|vacation|sick) (balance|status|entitlement)',
-        r'(leave|time off|vacation|sick) (balance|summary|report|status|entitlement)',
-        r'(show|display|list)\s+(my\s+)?(leave|time off|vacation|sick)\s*(balance|summary|history|days|entitlement)',
-        r'(leave|time off|vacation|sick).*\b(history|taken|used|remaining|left|available)\b',
-        
-        # Patterns for planned/scheduled time off variations
-        r'\b(planned|scheduled|upcoming|future)\s+(off\s+days?|time\s+off|leave|vacation|holidays?)\b',
-        r'\b(off\s+days?|time\s+off|leave|vacation|holidays?)\s+(planned|scheduled|upcoming|coming\s+up)\b',
-        r'\bwhat.*\b(planned|scheduled|upcoming)\b.*(off|leave|vacation|time\s+off)\b',
-        r'\b(show|display|list|tell).*\b(planned|scheduled|upcoming)\b.*(off|leave|vacation|time\s+off)\b',
-        r'\bdo\s+i\s+have.*\b(planned|scheduled|upcoming)\b.*(off|leave|vacation|time\s+off)\b',
-        r'\bany.*\b(planned|scheduled|upcoming)\b.*(off\s+days?|time\s+off|leave|vacation)\b',
-        r'\bmy.*\b(planned|scheduled|upcoming)\b.*(off\s+days?|time\s+off|leave|vacation)\b',
-        r'\bwhen.*\b(am\s+i|will\s+i\s+be)\b.*(off|on\s+leave|on\s+vacation)\b',
-        r'\bdays?\s+(i\s+have\s+)?(planned|scheduled|booked|coming\s+up)\b',
-        r'\btime\s+off.*\b(planned|scheduled|booked|coming\s+up)\b',
-        r'\b(scheduled|planned)\s+(days?\s+off|time\s+off)\b'
+    if _LEAVE_BALANCE_RE.search(query_lower):
+        return True
+    # Fuzzy matching for very flexible queries (best keyword must score above 80)
+    best = process.extractOne(query_lower, BALANCE_KEYWORDS, scorer=fuzz.partial_ratio, score_cutoff=80)
+    return best is not None and best[1] > 80
+
+# Leave request states shown as scheduled days off, with their display labels
+_SCHEDULED_STATE_LABELS = {'validate': 'Approved', 'confirm': 'Pending', 'draft': 'Pending'}
+
+def _format_scheduled_request(request):
+    """One '- **dates** - type (status) - duration' line for a scheduled leave request"""
+    holiday_status = request.get('holiday_status_id')
+    status_name = holiday_status[1] if isinstance(holiday_status, (list, tuple)) else 'Unknown'
+    date_from = request.get('date_from', '')
+    date_to = request.get('date_to', '')
+    days = request.get('number_of_days', 0)
+    status = _SCHEDULED_STATE_LABELS[request['state']]
+    
+    # Format dates (Odoo sends 'YYYY-MM-DD HH:MM:SS'; the date part is shown as is)
+    if date_from and date_to:
+        from_date = date_from.split(' ')[0]
+        to_date = date_to.split(' ')[0]
+        if not (_ISO_DATE_RE.fullmatch(from_date) and _ISO_DATE_RE.fullmatch(to_date)):
+            date_range = f"{date_from} to {date_to}"
+        elif from_date == to_date:
+            date_range = from_date
+        else:
+            date_range = f"{from_date} to {to_date}"
+    else:
+        date_range = "Date not specified"
+    
+    return f"- **{date_range}** - {status_name} ({status}) - {days} day{'s' if days != 1 else ''}"
+
+def _format_balance_lines(display_name, info):
+    """Balance line plus allocated/taken (and pending, if any) sub-lines for one leave type"""
+    requested = info.get('requested', 0)
+    return [
+        f"- **{display_name}**: {info.get('balance', 0)} days available",
+        f"  - Allocated: {info.get('allocated', 0)} days",
+        f"  - Taken: {info.get('taken', 0)} days",
+        *([f"  - Pending requests: {requested} days"] if requested > 0 else []),
     ]
-    for pat in patterns:
-        if re.search(pat, query_lower):
-            return True
-    # Fuzzy matching for very flexible queries
-    for k in balance_keywords:
-        if fuzz.partial_ratio(k, query_lower) > 80:
-            return True
-    return False
 
 def format_leave_balance(employee_data):
     """
     Fetch and format the user's leave balances for display, including scheduled days off.
     """
-    from datetime import datetime
     employee_id = employee_data.get('id')
     leave_data = get_employee_leave_data(employee_id)
     
     lines = []
     
     # Show scheduled days off (both approved and pending)
-    requests = leave_data.get('requests', [])
-    scheduled_days = []
-    
-    if requests:
-        for request in requests:
-            if request.get('state') in ['validate', 'confirm', 'draft']:
-                status_name = request.get('holiday_status_id', [None, 'Unknown'])[1] if isinstance(request.get('holiday_status_id'), (list, tuple)) else 'Unknown'
-                date_from = request.get('date_from', '')
-                date_to = request.get('date_to', '')
-                days = request.get('number_of_days', 0)
-                state = request.get('state', '')
-                
-                # Format status
-                if state == 'validate':
-                    status = 'Approved'
-                elif state == 'confirm':
-                    status = 'Pending'
-                elif state == 'draft':
-                    status = 'Pending'
-                else:
-                    status = state.title()
-                
-                # Format dates
-                if date_from and date_to:
-                    try:
-                        from_date = datetime.strptime(date_from.split(' ')[0], '%Y-%m-%d').strftime('%Y-%m-%d')
-                        to_date = datetime.strptime(date_to.split(' ')[0], '%Y-%m-%d').strftime('%Y-%m-%d')
-                        
-                        if from_date == to_date:
-                            date_range = from_date
-                        else:
-                            date_range = f"{from_date} to {to_date}"
-                    except:
-                        date_range = f"{date_from} to {date_to}"
-                else:
-                    date_range = "Date not specified"
-                
-                duration = f"{days} day{'s' if days != 1 else ''}"
-                scheduled_days.append(f"- **{date_range}** - {status_name} ({status}) - {duration}")
+    scheduled_days = [
+        _format_scheduled_request(request)
+        for request in leave_data.get('requests') or ()
+        if request.get('state') in _SCHEDULED_STATE_LABELS
+    ]
     
     if scheduled_days:
-        lines.append("**📅 Scheduled Days Off:**\n")
-        lines.extend(scheduled_days)
-        lines.append("")  # Add blank line
+        lines += ["**📅 Scheduled Days Off:**\n", *scheduled_days, ""]  # blank line after the list
     
     # Show leave balances
     summary = leave_data.get('summary', {})
+    lines.append("**📊 Leave Balances:**\n")
     if summary:
-        lines.append("**📊 Leave Balances:**\n")
-        
         # Prioritize Annual and Sick leave first
-        priority_types = []
-        other_types = []
+        annual_types, sick_types, other_types = [], [], []
         
         for leave_type, info in summary.items():
-            if 'annual' in leave_type.lower() or 'vacation' in leave_type.lower():
-                priority_types.insert(0, (leave_type, info, "Annual Leave"))
-            elif 'sick' in leave_type.lower():
-                priority_types.append((leave_type, info, "Sick Leave"))
+            leave_type_lower = leave_type.lower()
+            if 'annual' in leave_type_lower or 'vacation' in leave_type_lower:
+                annual_types.append((info, "Annual Leave"))
+            elif 'sick' in leave_type_lower:
+                sick_types.append((info, "Sick Leave"))
             else:
-                other_types.append((leave_type, info, leave_type))
+                other_types.append((info, leave_type))
         
-        # Display priority types first, then others
-        for leave_type, info, display_name in priority_types + other_types:
-            balance = info.get('balance', 0)
-            allocated = info.get('allocated', 0)
-            taken = info.get('taken', 0)
-            requested = info.get('requested', 0)
-            
-            lines.append(f"- **{display_name}**: {balance} days available")
-            lines.append(f"  - Allocated: {allocated} days")
-            lines.append(f"  - Taken: {taken} days")
-            if requested > 0:
-                lines.append(f"  - Pending requests: {requested} days")
+        # Annual types (in reverse summary order, as before), then sick, then the rest
+        for info, display_name in (*reversed(annual_types), *sick_types, *other_types):
+            lines += _format_balance_lines(display_name, info)
     else:
-        lines.append("**📊 Leave Balances:**\n")
         lines.append("I couldn't find detailed leave balance data for you. Please contact HR.")
     
     return "\n".join(lines) if lines else "I couldn't find any leave data for you. Please contact HR."
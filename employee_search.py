@@ -2,16 +2,33 @@
 import streamlit as st
 from odoo_connector import get_employee_data, get_current_user_employee_data
 import re
+import time
+
+EMPLOYEE_LOOKUP_TTL = 300  # seconds
+
+def _cached_lookup(key, fetch):
+    """
+    Return fetch() for this session, reusing a non-empty result for
+    EMPLOYEE_LOOKUP_TTL so reruns and repeated searches skip the Odoo round-trip.
+    Kept in session_state rather than st.cache_data: the data belongs to the logged-in user.
+    """
+    cache = st.session_state.setdefault('_employee_lookup_cache', {})
+    cached = cache.get(key)
+    if cached and cached[0] > time.time() - EMPLOYEE_LOOKUP_TTL:
+        return cached[1]
+    
+    data = fetch()
+    if data:
+        cache[key] = (time.time(), data)
+    return data
 
 class EmployeeSearchManager:
     def __init__(self):
         self._initialize_session_state()
     
     def _initialize_session_state(self):
-        if 'manual_search_mode' not in st.session_state:
-            st.session_state.manual_search_mode = False
-        if 'employee_data' not in st.session_state:
-            st.session_state.employee_data = None
+        st.session_state.setdefault('manual_search_mode', False)
+        st.session_state.setdefault('employee_data', None)
     
     def render_search_interface(self):
         """Render the employee search interface"""
@@ -33,7 +50,9 @@ class EmployeeSearchManager:
         """Auto-load current user data"""
         if not st.session_state.get('auto_loaded'):
             with st.spinner("Loading your data..."):
-                current_user_data = get_current_user_employee_data()
+                current_user_data = _cached_lookup(
+                    ('current_user', st.session_state.get('odoo_uid')), get_current_user_employee_data
+                )
                 if current_user_data:
                     st.session_state.employee_data = current_user_data
                     st.session_state.auto_loaded = True
@@ -43,7 +62,8 @@ class EmployeeSearchManager:
     def search_employee(self, name):
         """Search for an employee by name"""
         with st.spinner(f"Searching for: {name}"):
-            person_data = get_employee_data(name)
+            norm_name = " ".join(name.lower().split())
+            person_data = _cached_lookup(('search', norm_name), lambda: get_employee_data(name))
             
             if person_data:
                 st.session_state.employee_data = person_data
@@ -69,22 +89,23 @@ class EmployeeSearchManager:
             </div>
             """, unsafe_allow_html=True)
 
+SEARCH_KEYWORDS = ['who is', 'find', 'search for', 'look up', 'employee details', 'contact info for']
+_SEARCH_INTENT_RE = re.compile('|'.join(map(re.escape, SEARCH_KEYWORDS)))
+# Only these keywords are followed by a name to look up
+_SEARCH_NAME_RE = re.compile(r'(?:who is|find|search for|look up)\s+(.+)', re.IGNORECASE)
+
 def detect_employee_search_intent(query):
     """
     Detect if the user is trying to search for an employee.
     """
-    query_lower = query.lower()
-    search_keywords = ['who is', 'find', 'search for', 'look up', 'employee details', 'contact info for']
-    if any(keyword in query_lower for keyword in search_keywords):
-        return True
-    return False
+    return _SEARCH_INTENT_RE.search(query.lower()) is not None
 
 def handle_employee_search(query):
     """
     Handles the employee search flow.
     """
     # Extract the name from the query
-    name_match = re.search(r'(?:who is|find|search for|look up)\s+(.+)', query, re.IGNORECASE)
+    name_match = _SEARCH_NAME_RE.search(query)
     if name_match:
         name = name_match.group(1).strip()
         searcher = EmployeeSearchManager()
@@ -11,6 +11,7 @@ Currently supports only the [EXP_GEN] Miscellaneous category, with fields:
 Future extensions: receipt upload, more categories, currency selection.
 """
 
+import re
 import streamlit as st
 from datetime import datetime
 from typing import Optional, Dict, Any
@@ -23,6 +24,67 @@ from odoo_connector import create_and_submit_expense
 # --- Workflow State Keys ---
 EXPENSE_STATE_KEY = "expense_report_state"
 
+# --- Date Input ---
+INPUT_DATE_FORMAT = "%d/%m/%Y"
+ODOO_DATE_FORMAT = "%Y-%m-%d"
+_INPUT_DATE_RE = re.compile(r'([0-9]{1,2})/([0-9]{1,2})/([0-9]{4})')
+
+def _parse_input_date(text: str) -> datetime:
+    """Parse a DD/MM/YYYY reply, raising ValueError like strptime does"""
+    match = _INPUT_DATE_RE.fullmatch(text)
+    if match:
+        day, month, year = map(int, match.groups())
+        return datetime(year, month, day)
+    # Anything unusual goes through strptime so accepted inputs stay identical
+    return datetime.strptime(text, INPUT_DATE_FORMAT)
+
+# --- Category Selection ---
+_CATEGORY_MENU = (
+    "1. [EXP_GEN] Miscellaneous\n"
+    "2. [TRANS & ACC] Travel & Accommodation\n"
+    "3. [PER_DIEM] Per Diem\n"
+    "\nType the number or the category name.\n(Type 'cancel' at any time to abort.)"
+)
+
+_CATEGORY_ALIASES = {
+    **dict.fromkeys(["1", "[exp_gen] miscellaneous", "miscellaneous", "exp_gen"], "misc"),
+    **dict.fromkeys(["2", "[trans & acc] travel & accommodation", "travel & accommodation", "trans & acc", "travel", "accommodation"], "travel"),
+    **dict.fromkeys(["3", "[per_diem] per diem", "per diem", "perdiem", "per-diem"], "per_diem"),
+}
+
+_CATEGORY_PROMPTS = {
+    "misc": "Please enter a description for your expense (e.g., 'Lunch with Customer').",
+    "travel": "Please enter a description for your Travel & Accommodation expense (e.g., 'Hotel for business trip').",
+    "per_diem": "Please enter a description for your Per Diem expense (e.g., 'Business trip per diem').",
+}
+
+# --- Confirmation Summaries ---
+_EXPENSE_SUMMARY_TMPL = (
+    "Expense Summary:\n"
+    "Description: {description}\n"
+    "Purpose: {purpose}\n"
+    "Attached Link: {attached_link}\n"
+    "Category: {category}\n"
+    "Total: {total} JOD\n"
+    "Date: {date}\n"
+    "Company: {company}\n\n"
+    "Type 'confirm' to submit this expense, or 'cancel' to abort."
+)
+
+_PER_DIEM_SUMMARY_TMPL = (
+    "Expense Summary:\n"
+    "Description: {description}\n"
+    "Purpose: {purpose}\n"
+    "Attached Link: {attached_link}\n"
+    "Category: [PER_DIEM] Per Diem\n"
+    "Date: {date}\n"
+    "From: {from_date}\n"
+    "To: {to_date}\n"
+    "Destination: {destination}\n"
+    "Company: {company}\n\n"
+    "Type 'confirm' to submit this expense, or 'cancel' to abort."
+)
+
 # --- Main Workflow Functions ---
 def start_expense_workflow(session_state: Any, user_profile: dict):
     """
@@ -35,16 +97,16 @@ def start_expense_workflow(session_state: Any, user_profile: dict):
         "company_id": user_profile.get("company_id"),
         "company_name": user_profile.get("company_name"),
     }
-    return (
-        "Let's create a new expense report! Please choose a category:\n"
-        "1. [EXP_GEN] Miscellaneous\n"
-        "2. [TRANS & ACC] Travel & Accommodation\n"
-        "3. [PER_DIEM] Per Diem\n"
-        "\nType the number or the category name.\n(Type 'cancel' at any time to abort.)"
-    )
+    return "Let's create a new expense report! Please choose a category:\n" + _CATEGORY_MENU
+
+# Destinations barely change, so one successful fetch is reused for the session
+DESTINATIONS_CACHE_KEY = "_per_diem_destinations"
 
 def fetch_per_diem_destinations():
     """Fetch the list of available destinations (res.country.state) from Odoo."""
+    cached = st.session_state.get(DESTINATIONS_CACHE_KEY)
+    if cached:
+        return cached
     try:
         states = st.session_state.odoo_models.execute_kw(
             st.session_state.db,
@@ -55,228 +117,229 @@ def fetch_per_diem_destinations():
             [[]],
             {'fields': ['id', 'name'], 'limit': 100}
         )
+        if states:
+            st.session_state[DESTINATIONS_CACHE_KEY] = states
         return states
     except Exception as e:
         return []
 
-def handle_expense_workflow(session_state: Any, user_input: str) -> Optional[str]:
-    """
-    Handle the next step in the expense workflow based on current state and user input.
-    Returns a prompt for the next step, or None if the workflow is complete.
-    """
-    state = session_state.get(EXPENSE_STATE_KEY)
-    if not state:
-        return ""
-    step = state["step"]
-    data = state["data"]
+# --- Workflow Steps ---
+def _handle_category(session_state: Any, state: dict, data: dict, text: str, lowered: str) -> Optional[str]:
+    category = _CATEGORY_ALIASES.get(lowered)
+    if category:
+        data["category"] = category
+        state["step"] = "description"
+        return _CATEGORY_PROMPTS[category]
+    return "Invalid category. Please choose one of the following:\n" + _CATEGORY_MENU
 
-    # Universal cancel support
-    if user_input.strip().lower() == "cancel":
-        session_state.pop(EXPENSE_STATE_KEY, None)
-        return "Expense report creation cancelled. Returning to normal bot activity."
+def _handle_description(session_state: Any, state: dict, data: dict, text: str, lowered: str) -> Optional[str]:
+    data["description"] = text
+    state["step"] = "purpose"
+    return "Optionally, please enter the purpose of this expense (or type 'skip' to leave blank)."
+
+def _handle_purpose(session_state: Any, state: dict, data: dict, text: str, lowered: str) -> Optional[str]:
+    if lowered != "skip":
+        data["purpose"] = text
+    else:
+        data["purpose"] = None
+    state["step"] = "attached_link"
+    return "Optionally, please enter an attached link (or type 'skip' to leave blank)."
+
+def _handle_attached_link(session_state: Any, state: dict, data: dict, text: str, lowered: str) -> Optional[str]:
+    if lowered != "skip":
+        data["attached_link"] = text
+    else:
+        data["attached_link"] = None
+    # Now continue to the next required step based on category
+    if data.get("category") == "per_diem":
+        state["step"] = "date"
+        return "What is the expense date? (please use DD/MM/YYYY)"
+    elif data.get("category") == "travel":
+        state["step"] = "total"
+        return "What is the total amount paid? (in JOD)"
+    else:
+        state["step"] = "total"
+        return "What is the total amount paid? (in JOD)"
 
-    if step == "category":
-        val = user_input.strip().lower()
-        if val in ["1", "[exp_gen] miscellaneous", "miscellaneous", "exp_gen"]:
-            data["category"] = "misc"
-            state["step"] = "description"
-            return "Please enter a description for your expense (e.g., 'Lunch with Customer')."
-        elif val in ["2", "[trans & acc] travel & accommodation", "travel & accommodation", "trans & acc", "travel", "accommodation"]:
-            data["category"] = "travel"
-            state["step"] = "description"
-            return "Please enter a description for your Travel & Accommodation expense (e.g., 'Hotel for business trip')."
-        elif val in ["3", "[per_diem] per diem", "per diem", "perdiem", "per-diem"]:
-            data["category"] = "per_diem"
-            state["step"] = "description"
-            return "Please enter a description for your Per Diem expense (e.g., 'Business trip per diem')."
+def _handle_total(session_state: Any, state: dict, data: dict, text: str, lowered: str) -> Optional[str]:
+    try:
+        total = float(text)
+        if total <= 0:
+            raise ValueError
+        data["total"] = total
+        state["step"] = "date"
+        return "What is the expense date? (please use DD/MM/YYYY)"
+    except ValueError:
+        return "Please enter a valid positive number for the total amount (in JOD)."
+
+def _handle_date(session_state: Any, state: dict, data: dict, text: str, lowered: str) -> Optional[str]:
+    try:
+        date_obj = _parse_input_date(text)
+        data["date"] = date_obj.strftime(ODOO_DATE_FORMAT)
+        if data.get("category") == "per_diem":
+            state["step"] = "from_date"
+            return "What is the start date for your per diem? (please use DD/MM/YYYY)"
         else:
-            return (
-                "Invalid category. Please choose one of the following:\n"
-                "1. [EXP_GEN] Miscellaneous\n"
-                "2. [TRANS & ACC] Travel & Accommodation\n"
-                "3. [PER_DIEM] Per Diem\n"
-                "\nType the number or the category name.\n(Type 'cancel' at any time to abort.)"
+            state["step"] = "confirm"
+            cat_display = (
+                "[EXP_GEN] Miscellaneous" if data.get("category") == "misc" else "[TRANS & ACC] Travel & Accommodation"
+            )
+            return _EXPENSE_SUMMARY_TMPL.format(
+                description=data['description'],
+                purpose=data.get('purpose') or '-',
+                attached_link=data.get('attached_link') or '-',
+                category=cat_display,
+                total=data['total'],
+                date=date_obj.strftime(INPUT_DATE_FORMAT),
+                company=state['company_name'],
             )
+    except ValueError:
+        return "Please enter a valid date in DD/MM/YYYY format."
+
+def _handle_from_date(session_state: Any, state: dict, data: dict, text: str, lowered: str) -> Optional[str]:
+    try:
+        from_date_obj = _parse_input_date(text)
+        data["from_date"] = from_date_obj.strftime(ODOO_DATE_FORMAT)
+        state["step"] = "to_date"
+        return "What is the end date for your per diem? (please use DD/MM/YYYY)"
+    except ValueError:
+        return "Please enter a valid date in DD/MM/YYYY format."
 
-    if step == "description":
-        data["description"] = user_input.strip()
-        state["step"] = "purpose"
-        return "Optionally, please enter the purpose of this expense (or type 'skip' to leave blank)."
+def _handle_to_date(session_state: Any, state: dict, data: dict, text: str, lowered: str) -> Optional[str]:
+    try:
+        to_date_obj = _parse_input_date(text)
+        data["to_date"] = to_date_obj.strftime(ODOO_DATE_FORMAT)
+        state["step"] = "destination"
+        # Fetch destinations
+        destinations = fetch_per_diem_destinations()
+        if not destinations:
+            return "❌ Could not fetch destinations from Odoo. Please contact HR."
+        state["available_destinations"] = destinations
+        # Index once so each reply is a dict lookup; the first entry wins on duplicates
+        state["_dest_by_name"] = {}
+        state["_dest_by_id"] = {}
+        for d in destinations:
+            state["_dest_by_name"].setdefault(d["name"].lower(), d)
+            state["_dest_by_id"].setdefault(str(d["id"]), d)
+        dest_list = "\n".join([f"- {d['name']}" for d in destinations[:10]])
+        return f"Please select the destination for your per diem. Here are some options:\n\n{dest_list}\n\nType the destination name or ID. (Type 'show all' to see the full list.)"
+    except ValueError:
+        return "Please enter a valid date in DD/MM/YYYY format."
 
-    elif step == "purpose":
-        if user_input.strip().lower() != "skip":
-            data["purpose"] = user_input.strip()
-        else:
-            data["purpose"] = None
-        state["step"] = "attached_link"
-        return "Optionally, please enter an attached link (or type 'skip' to leave blank)."
+def _handle_destination(session_state: Any, state: dict, data: dict, text: str, lowered: str) -> Optional[str]:
+    destinations = state.get("available_destinations", [])
+    if lowered == "show all":
+        dest_list = "\n".join([f"- {d['name']} (ID: {d['id']})" for d in destinations])
+        return f"All available destinations:\n\n{dest_list}\n\nType the destination name or ID."
+    # Try to match by name or ID
+    match = state.get("_dest_by_name", {}).get(lowered) or state.get("_dest_by_id", {}).get(text)
+    if match:
+        data["destination_id"] = match["id"]
+        state["step"] = "confirm"
+        return _PER_DIEM_SUMMARY_TMPL.format(
+            description=data['description'],
+            purpose=data.get('purpose') or '-',
+            attached_link=data.get('attached_link') or '-',
+            date=data['date'],
+            from_date=data['from_date'],
+            to_date=data['to_date'],
+            destination=match['name'],
+            company=state['company_name'],
+        )
+    else:
+        dest_list = "\n".join([f"- {d['name']} (ID: {d['id']})" for d in destinations[:10]])
+        return f"I couldn't find a matching destination. Here are some options:\n\n{dest_list}\n\nType the destination name or ID. (Type 'show all' to see the full list.)"
 
-    elif step == "attached_link":
-        if user_input.strip().lower() != "skip":
-            data["attached_link"] = user_input.strip()
-        else:
-            data["attached_link"] = None
-        # Now continue to the next required step based on category
+def _handle_confirm(session_state: Any, state: dict, data: dict, text: str, lowered: str) -> Optional[str]:
+    if lowered == "confirm":
+        # Actually call Odoo to create and submit the expense
         if data.get("category") == "per_diem":
-            state["step"] = "date"
-            return "What is the expense date? (please use DD/MM/YYYY)"
+            result = create_expense_report_odoo_per_diem(
+                state["user_id"],
+                state["company_id"],
+                data["description"],
+                0,  # total is not needed for per diem, pass 0
+                data["date"],
+                data["from_date"],
+                data["to_date"],
+                data["destination_id"],
+                data.get("purpose"),
+                data.get("attached_link")
+            )
         elif data.get("category") == "travel":
-            state["step"] = "total"
-            return "What is the total amount paid? (in JOD)"
-        else:
-            state["step"] = "total"
-            return "What is the total amount paid? (in JOD)"
-
-    elif step == "total":
-        try:
-            total = float(user_input.strip())
-            if total <= 0:
-                raise ValueError
-            data["total"] = total
-            state["step"] = "date"
-            return "What is the expense date? (please use DD/MM/YYYY)"
-        except ValueError:
-            return "Please enter a valid positive number for the total amount (in JOD)."
-
-    elif step == "date":
-        try:
-            date_obj = datetime.strptime(user_input.strip(), "%d/%m/%Y")
-            data["date"] = date_obj.strftime("%Y-%m-%d")
-            if data.get("category") == "per_diem":
-                state["step"] = "from_date"
-                return "What is the start date for your per diem? (please use DD/MM/YYYY)"
-            else:
-                state["step"] = "confirm"
-                cat_display = (
-                    "[EXP_GEN] Miscellaneous" if data.get("category") == "misc" else "[TRANS & ACC] Travel & Accommodation"
-                )
-                summary = (
-                    f"Expense Summary:\n"
-                    f"Description: {data['description']}\n"
-                    f"Purpose: {data.get('purpose') or '-'}\n"
-                    f"Attached Link: {data.get('attached_link') or '-'}\n"
-                    f"Category: {cat_display}\n"
-                    f"Total: {data['total']} JOD\n"
-                    f"Date: {date_obj.strftime('%d/%m/%Y')}\n"
-                    f"Company: {state['company_name']}\n\n"
-                    "Type 'confirm' to submit this expense, or 'cancel' to abort."
-                )
-                return summary
-        except ValueError:
-            return "Please enter a valid date in DD/MM/YYYY format."
-
-    elif step == "from_date":
-        try:
-            from_date_obj = datetime.strptime(user_input.strip(), "%d/%m/%Y")
-            data["from_date"] = from_date_obj.strftime("%Y-%m-%d")
-            state["step"] = "to_date"
-            return "What is the end date for your per diem? (please use DD/MM/YYYY)"
-        except ValueError:
-            return "Please enter a valid date in DD/MM/YYYY format."
-
-    elif step == "to_date":
-        try:
-            to_date_obj = datetime.strptime(user_input.strip(), "%d/%m/%Y")
-            data["to_date"] = to_date_obj.strftime("%Y-%m-%d")
-            state["step"] = "destination"
-            # Fetch destinations
-            destinations = fetch_per_diem_destinations()
-            if not destinations:
-                return "❌ Could not fetch destinations from Odoo. Please contact HR."
-            state["available_destinations"] = destinations
-            dest_list = "\n".join([f"- {d['name']}" for d in destinations[:10]])
-            return f"Please select the destination for your per diem. Here are some options:\n\n{dest_list}\n\nType the destination name or ID. (Type 'show all' to see the full list.)"
-        except ValueError:
-            return "Please enter a valid date in DD/MM/YYYY format."
-
-    elif step == "destination":
-        destinations = state.get("available_destinations", [])
-        if user_input.strip().lower() == "show all":
-            dest_list = "\n".join([f"- {d['name']} (ID: {d['id']})" for d in destinations])
-            return f"All available destinations:\n\n{dest_list}\n\nType the destination name or ID."
-        # Try to match by name or ID
-        match = None
-        for d in destinations:
-            if user_input.strip().lower() == d["name"].lower() or user_input.strip() == str(d["id"]):
-                match = d
-                break
-        if match:
-            data["destination_id"] = match["id"]
-            state["step"] = "confirm"
-            summary = (
-                f"Expense Summary:\n"
-                f"Description: {data['description']}\n"
-                f"Purpose: {data.get('purpose') or '-'}\n"
-                f"Attached Link: {data.get('attached_link') or '-'}\n"
-                f"Category: [PER_DIEM] Per Diem\n"
-                f"Date: {data['date']}\n"
-                f"From: {data['from_date']}\n"
-                f"To: {data['to_date']}\n"
-                f"Destination: {match['name']}\n"
-                f"Company: {state['company_name']}\n\n"
-                "Type 'confirm' to submit this expense, or 'cancel' to abort."
+            result = create_expense_report_odoo_travel(
+                state["user_id"],
+                state["company_id"],
+                data["description"],
+                data["total"],
+                data["date"],
+                data.get("purpose"),
+                data.get("attached_link")
             )
-            return summary
         else:
-            dest_list = "\n".join([f"- {d['name']} (ID: {d['id']})" for d in destinations[:10]])
-            return f"I couldn't find a matching destination. Here are some options:\n\n{dest_list}\n\nType the destination name or ID. (Type 'show all' to see the full list.)"
-
-    elif step == "confirm":
-        if user_input.strip().lower() == "confirm":
-            # Actually call Odoo to create and submit the expense
-            if data.get("category") == "per_diem":
-                result = create_expense_report_odoo_per_diem(
-                    state["user_id"],
-                    state["company_id"],
-                    data["description"],
-                    0,  # total is not needed for per diem, pass 0
-                    data["date"],
-                    data["from_date"],
-                    data["to_date"],
-                    data["destination_id"],
-                    data.get("purpose"),
-                    data.get("attached_link")
-                )
-            elif data.get("category") == "travel":
-                result = create_expense_report_odoo_travel(
-                    state["user_id"],
-                    state["company_id"],
-                    data["description"],
-                    data["total"],
-                    data["date"],
-                    data.get("purpose"),
-                    data.get("attached_link")
-                )
-            else:
-                result = create_expense_report_odoo(
-                    state["user_id"],
-                    state["company_id"],
-                    data["description"],
-                    data["total"],
-                    data["date"],
-                    data.get("purpose"),
-                    data.get("attached_link")
-                )
-            session_state.pop(EXPENSE_STATE_KEY, None)
-            if result.get("success"):
-                # Track expense submission
-                amount = data.get("total", 0.0) if data.get("total") is not None else 0.0
-                details = {
-                    'category': data.get('category'),
-                    'description': data.get('description'),
-                    'expense_id': result.get('expense_id') or result.get('id')
-                }
-                track_expense_report(amount=amount, details=details)
-                return f"✅ Your expense report has been submitted for approval! (ID: {result.get('expense_id', 'N/A')})"
-            else:
-                return f"❌ Failed to submit expense: {result.get('message', 'Unknown error')}"
-        elif user_input.strip().lower() == "cancel":
-            session_state.pop(EXPENSE_STATE_KEY, None)
-            return "Expense report creation cancelled."
+            result = create_expense_report_odoo(
+                state["user_id"],
+                state["company_id"],
+                data["description"],
+                data["total"],
+                data["date"],
+                data.get("purpose"),
+                data.get("attached_link")
+            )
+        session_state.pop(EXPENSE_STATE_KEY, None)
+        if result.get("success"):
+            # Track expense submission
+            amount = data.get("total", 0.0) if data.get("total") is not None else 0.0
+            details = {
+                'category': data.get('category'),
+                'description': data.get('description'),
+                'expense_id': result.get('expense_id') or result.get('id')
+            }
+            track_expense_report(amount=amount, details=details)
+            return f"✅ Your expense report has been submitted for approval! (ID: {result.get('expense_id', 'N/A')})"
         else:
-            return "Please type 'confirm' to submit or 'cancel' to abort."
+            return f"❌ Failed to submit expense: {result.get('message', 'Unknown error')}"
+    elif lowered == "cancel":
+        session_state.pop(EXPENSE_STATE_KEY, None)
+        return "Expense report creation cancelled."
+    else:
+        return "Please type 'confirm' to submit or 'cancel' to abort."
+
+_STEP_HANDLERS = {
+    "category": _handle_category,
+    "description": _handle_description,
+    "purpose": _handle_purpose,
+    "attached_link": _handle_attached_link,
+    "total": _handle_total,
+    "date": _handle_date,
+    "from_date": _handle_from_date,
+    "to_date": _handle_to_date,
+    "destination": _handle_destination,
+    "confirm": _handle_confirm,
+}
+
+def handle_expense_workflow(session_state: Any, user_input: str) -> Optional[str]:
+    """
+    Handle the next step in the expense workflow based on current state and user input.
+    Returns a prompt for the next step, or None if the workflow is complete.
+    """
+    state = session_state.get(EXPENSE_STATE_KEY)
+    if not state:
+        return ""
+
+    # Normalise the reply once; handlers get both the stripped and lowercased text
+    text = user_input.strip()
+    lowered = text.lower()
+
+    # Universal cancel support
+    if lowered == "cancel":
+        session_state.pop(EXPENSE_STATE_KEY, None)
+        return "Expense report creation cancelled. Returning to normal bot activity."
 
-    return None
+    handler = _STEP_HANDLERS.get(state["step"])
+    if handler is None:
+        return None
+    return handler(session_state, state, state["data"], text, lowered)
 
 # --- Odoo Connector Function (to be implemented) ---
 def create_expense_report_odoo(
@@ -8,6 +8,19 @@ from config import (
     PARTNER_FIELDS
 )
 
+def get_server_proxy(url):
+    """
+    ServerProxy per endpoint URL, kept for the current session so reruns and
+    re-logins reuse its open HTTP/1.1 connection instead of a new TCP/TLS handshake.
+    Per session rather than per process: a shared connection would serialize
+    every user's Odoo calls behind one another.
+    """
+    proxies = st.session_state.setdefault('_odoo_server_proxies', {})
+    proxy = proxies.get(url)
+    if proxy is None:
+        proxy = proxies[url] = xmlrpc.client.ServerProxy(url, allow_none=True)
+    return proxy
+
 def get_available_leave_types():
     """
     Get available leave types from Odoo
@@ -851,7 +864,7 @@ def connect_to_odoo(odoo_url, odoo_db, odoo_username, odoo_password):
     """
     try:
         # Connect to Odoo
-        common = xmlrpc.client.ServerProxy(f'{odoo_url}/xmlrpc/2/common', allow_none=True)
+        common = get_server_proxy(f'{odoo_url}/xmlrpc/2/common')
         # Verify connection by getting server version
         server_version = common.version()
         
@@ -860,7 +873,7 @@ def connect_to_odoo(odoo_url, odoo_db, odoo_username, odoo_password):
         
         if uid:
             # Create models service
-            models = xmlrpc.client.ServerProxy(f'{odoo_url}/xmlrpc/2/object', allow_none=True)
+            models = get_server_proxy(f'{odoo_url}/xmlrpc/2/object')
             st.session_state.odoo_uid = uid
             st.session_state.odoo_models = models
             st.session_state.odoo_connected = True
@@ -1396,7 +1409,8 @@ def get_employee_planning_data(employee_id):
 
 def enrich_employee_data(employee_data, employee_id):
     """
-    Try to add more fields to employee data one by one
+    Add more fields to employee data, in one read when permitted and
+    one by one otherwise
     
     Args:
         employee_data: Base employee data dictionary
@@ -1408,8 +1422,36 @@ def enrich_employee_data(employee_data, employee_id):
     if not employee_data:
         return None
     
+    # Fetch every additional field in a single round-trip; Odoo rejects the
+    # whole read if any one field is not accessible, so only then fall back
+    fields_to_try = EMPLOYEE_ADDITIONAL_FIELDS
+    try:
+        batch_data = st.session_state.odoo_models.execute_kw(
+            st.session_state.db,
+            st.session_state.odoo_uid,
+            st.session_state.password,
+            'hr.employee',
+            'read',
+            [employee_id],
+            {'fields': EMPLOYEE_ADDITIONAL_FIELDS}
+        )
+        if batch_data:
+            for field in EMPLOYEE_ADDITIONAL_FIELDS:
+                if batch_data[0].get(field):
+                    employee_data[field] = batch_data[0][field]
+            if 'debug_info' not in st.session_state:
+                st.session_state.debug_info = {}
+            st.session_state.debug_info['arabic_name_retrieval'] = {
+                'field_data': batch_data,
+                'employee_id': employee_id,
+                'field_value': batch_data[0].get('x_studio_employee_arabic_name')
+            }
+            fields_to_try = ()
+    except Exception:
+        pass
+    
     # Try each field individually
-    for field in EMPLOYEE_ADDITIONAL_FIELDS:
+    for field in fields_to_try:
         try:
             field_data = st.session_state.odoo_models.execute_kw(
                 st.session_state.db,
@@ -606,7 +606,8 @@ def handle_overtime_request(query: str, employee_data: Dict[str, Any]) -> Option
     Handle the multi-step process of creating an overtime request.
     This function now uses st.session_state to maintain its state.
     """
-    st.session_state.active_workflow = 'overtime_request'
+    if st.session_state.get('active_workflow') != 'overtime_request':
+        st.session_state.active_workflow = 'overtime_request'
     # Initialize state if it's the first time
     if 'overtime_request' not in st.session_state:
         st.session_state.overtime_request = {}
@@ -2,9 +2,20 @@
 import streamlit as st
 import os
 
+
+@st.cache_resource
+def _read_css(css_file):
+    """Read a stylesheet once per process; returns None if the file is missing"""
+    if not os.path.exists(css_file):
+        return None
+    with open(css_file) as f:
+        return f.read()
+
+
 class StyleManager:
-    def __init__(self, css_file="style.css"):
+    def __init__(self, css_file="style.css", theme_file="lilac.css"):
         self.css_file = css_file
+        self.theme_file = theme_file
     
     def load_css(self):
         """
@@ -16,9 +27,9 @@ class StyleManager:
         import streamlit as st, os, textwrap
 
         # keep your own stylesheet first
-        if os.path.exists(self.css_file):
-            with open(self.css_file) as f:
-                st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+        css = _read_css(self.css_file)
+        if css is not None:
+            st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
 
         st.markdown(
             textwrap.dedent(
@@ -74,6 +85,11 @@ class StyleManager:
             unsafe_allow_html=True,
         )
 
+        # Lilac Galaxy theme goes last so it overrides the rules above
+        theme_css = _read_css(self.theme_file)
+        if theme_css is not None:
+            st.markdown(f"<style>{theme_css}</style>", unsafe_allow_html=True)
+
     def _load_fallback_css(self):
         """Load fallback CSS if file doesn't exist"""
         fallback_css = """
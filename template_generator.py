@@ -10,6 +10,7 @@ from docx.shared import Pt
 import os
 from pathlib import Path
 import re
+from functools import lru_cache
 
 # Template configuration - using relative paths with pathlib
 TEMPLATES_DIR = Path(__file__).parent / "templates"
@@ -114,6 +115,11 @@ COUNTRY_ALIAS_PATTERNS: list[tuple[re.Pattern, str]] = [
     (re.compile(r"\b(turkiye|turkey)\b", re.I), "Turkey"),
 ]
 
+_EMBASSY_DATE_RE = re.compile(r'(\d{1,2})[/\-](\d{1,2})(?:[/\-](\d{2,4}))?')
+
+# Word boundaries avoid partial matches (e.g., 'oman' in 'roman')
+_COUNTRY_NAME_RES = tuple((ctry, re.compile(rf"\b{ctry.lower()}\b", re.I)) for ctry in COUNTRIES)
+
 def normalize_country_from_text(query: str) -> str | None:
     """Try to normalize a country mention in free text to a COUNTRIES entry.
 
@@ -135,10 +141,8 @@ def normalize_country_from_text(query: str) -> str | None:
 
     # Second pass: exact country names (word boundary match, case-insensitive)
     text_lower = text.lower()
-    for ctry in COUNTRIES:
-        name = ctry.lower()
-        # Use word boundaries to avoid partial matches (e.g., 'oman' in 'roman')
-        if re.search(rf"\b{name}\b", text_lower, re.I):
+    for ctry, name_re in _COUNTRY_NAME_RES:
+        if name_re.search(text_lower):
             return ctry
 
     return None
@@ -476,70 +480,61 @@ def fill_template(template_path: str, employee_data: Dict[str, Any], is_arabic:
     doc.save(output_stream)
     return output_stream.getvalue()
 
+# Template intent keywords, matched as substrings of the lowercased query.
+# Every multi-word template phrase contains 'letter' or 'certificate', so the
+# generic check only needs these four words
+TEMPLATE_KEYWORDS = ('template', 'document', 'certificate', 'letter')
+_ARABIC_KEYWORDS = ('arabic', 'عربي')  # 'عربي' also covers 'بالعربية'
+_EMPLOYMENT_KEYWORDS = ('employment', 'work', 'job')
+
+# Specific template types, checked in order after the Arabic employment letter
+_TEMPLATE_TYPE_KEYWORDS = (
+    ('employment_letter_embassy', ('embassy', 'visa', 'travel', 'consulate')),
+    ('experience_letter', ('experience', 'service', 'former', 'past')),
+    ('employment_letter', ('employment letter', 'work certificate', 'employment certificate')),
+    ('general_template_request', TEMPLATE_KEYWORDS),
+)
+
+@lru_cache(maxsize=512)
 def detect_template_intent(query: str) -> Optional[str]:
     """Detect if user is asking for a template"""
     query_lower = query.lower()
     
-    # Keywords for template requests
-    template_keywords = [
-        'employment letter', 'employment certificate', 'work certificate',
-        'experience letter', 'experience certificate', 'service certificate',
-        'embassy letter', 'visa letter', 'travel letter',
-        'arabic letter', 'letter in arabic', 'arabic certificate',
-        'template', 'document', 'certificate', 'letter'
-    ]
-    
     # Check for specific template types
-    if any(keyword in query_lower for keyword in ['arabic', 'عربي', 'بالعربية']):
-        if any(keyword in query_lower for keyword in ['employment', 'work', 'job']):
+    if any(keyword in query_lower for keyword in _ARABIC_KEYWORDS):
+        if any(keyword in query_lower for keyword in _EMPLOYMENT_KEYWORDS):
             return 'employment_letter_arabic'
     
-    if any(keyword in query_lower for keyword in ['embassy', 'visa', 'travel', 'consulate']):
-        return 'employment_letter_embassy'
-    
-    if any(keyword in query_lower for keyword in ['experience', 'service', 'former', 'past']):
-        return 'experience_letter'
-    
-    if any(keyword in query_lower for keyword in ['employment letter', 'work certificate', 'employment certificate']):
-        return 'employment_letter'
-    
-    # Check if any template keyword is present
-    if any(keyword in query_lower for keyword in template_keywords):
-        return 'general_template_request'
+    for template_type, keywords in _TEMPLATE_TYPE_KEYWORDS:
+        if any(keyword in query_lower for keyword in keywords):
+            return template_type
     
     return None
 
 def parse_embassy_details(query: str) -> Dict[str, Any]:
     """Parse embassy letter details from query"""
-    details = {
-        'country': None,
-        'start_date': None,
-        'end_date': None
+    country, start_date, end_date = _parse_embassy_fields(query, datetime.date.today().year)
+    # A fresh dict per call: the caller stores it and updates it in place
+    return {
+        'country': country,
+        'start_date': start_date,
+        'end_date': end_date
     }
-    
-    query_lower = query.lower()
 
-    # Try to normalize country from aliases and exact names
-    normalized = normalize_country_from_text(query)
-    if normalized:
-        details['country'] = normalized
-    else:
-        # legacy fallback (substring) with safer boundary matching
-        for country in COUNTRIES:
-            if re.search(rf"\b{re.escape(country.lower())}\b", query_lower):
-                details['country'] = country
-                break
+@lru_cache(maxsize=256)
+def _parse_embassy_fields(query: str, current_year: int) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """(country, start_date, end_date) for a query; dates without a year use current_year"""
+    country = normalize_country_from_text(query)
+    start_date = end_date = None
     
     # Try to parse dates
-    from datetime import datetime, timedelta
+    from datetime import datetime
     
     # Look for date patterns (DD/MM[/YYYY] or DD-MM[-YYYY])
     # Groups: 1=day, 2=month, 3=optional year
-    date_pattern = r'(\d{1,2})[/\-](\d{1,2})(?:[/\-](\d{2,4}))?'
-    dates = re.findall(date_pattern, query)
+    dates = _EMBASSY_DATE_RE.findall(query)
     
     if dates:
-        current_year = datetime.now().year
         parsed_dates = []
         
         for date_match in dates:
@@ -558,10 +553,10 @@ def parse_embassy_details(query: str) -> Dict[str, Any]:
                 continue
         
         if parsed_dates:
-            details['start_date'] = min(parsed_dates).strftime('%Y-%m-%d')
-            details['end_date'] = max(parsed_dates).strftime('%Y-%m-%d')
+            start_date = min(parsed_dates).strftime('%Y-%m-%d')
+            end_date = max(parsed_dates).strftime('%Y-%m-%d')
     
-    return details
+    return country, start_date, end_date
 
 def get_gendered_template_path(template_type: str, gender: str) -> Optional[str]:
     """Return the gendered template path if available, else the default."""
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import streamlit as st
+from arabic_english_detection import contains_arabic
 
 def test_arabic_name_field():
     """Test if we can retrieve the Arabic name field from Odoo"""
@@ -121,7 +122,8 @@ def handle_arabic_field_test(query, employee_data):
             arabic_value = arabic_test.get('value')
             response += f"✅ **Arabic Field Specific Test:** Successfully retrieved\n"
             response += f"- Value: `{arabic_value}`\n"
-            response += f"- Is Arabic script: {'✅ YES' if arabic_value and any('\u0600' <= c <= '\u06FF' for c in str(arabic_value)) else '❌ NO'}\n\n"
+            is_arabic = bool(arabic_value) and contains_arabic(str(arabic_value))
+            response += f"- Is Arabic script: {'✅ YES' if is_arabic else '❌ NO'}\n\n"
         else:
             response += f"❌ **Arabic Field Specific Test Failed:** {arabic_test.get('error', 'Unknown error')}\n\n"
         
@@ -2,6 +2,8 @@
 import streamlit as st
 import time
 import os
+from datetime import datetime
+from itertools import islice
 from activity_tracker import get_recent_activities, format_activity_time
 
 def load_css():
@@ -215,6 +217,10 @@ def render_sidebar(username, is_manual_search_mode, logout_callback):
         username: Current user's username
         is_manual_search_mode: Boolean for manual search mode
         logout_callback: Function to call when logout is clicked
+        
+    Returns:
+        The recent-activities placeholder, so activities logged later in the
+        run can be re-rendered in place
     """
     with st.sidebar:
         # Harmonious header
@@ -232,38 +238,14 @@ def render_sidebar(username, is_manual_search_mode, logout_callback):
         # Removed legacy last completed flow card to avoid duplication
 
         # Recent Activities list
-        activities = get_recent_activities()
         st.markdown("""
             <div style="font-weight: 600; color: #9B6DD6; margin: 0.5rem 1rem 0.5rem 1rem; font-size: 14px; display: flex; align-items: center;">
                 <span style="margin-right: 0.5rem;">🕘</span>Recent Activities
             </div>
         """, unsafe_allow_html=True)
 
-        if activities:
-            # Render up to 6 most recent items
-            for act in activities[:6]:
-                icon = act.get('icon', '📋')
-                title = act.get('title', 'Activity')
-                summary = act.get('summary', '')
-                ts = act.get('timestamp', '')
-                when = format_activity_time(ts)
-                st.markdown(
-                    f"""
-                    <div style="background: rgba(255, 255, 255, 0.8); border: 1px solid rgba(155, 109, 214, 0.15); padding: 0.75rem 1rem; border-radius: 12px; margin: 0.5rem 1rem; box-shadow: 0 2px 8px rgba(155, 109, 214, 0.08);">
-                      <div style="display: flex; align-items: center; gap: 8px; margin-bottom: 4px;">
-                        <span>{icon}</span>
-                        <div style="font-weight: 600; color: #2d333a; font-size: 13px;">{title}</div>
-                        <div style="margin-left: auto; color: #6e7681; font-size: 12px;">{when}</div>
-                      </div>
-                      <div style="font-size: 12px; color: #6e7681; line-height: 1.4;">{summary}</div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True,
-                )
-        else:
-            st.markdown("""
-                <div style="color: #6e7681; font-size: 12px; margin: 0 1rem 0.5rem 1rem;">No activities yet</div>
-            """, unsafe_allow_html=True)
+        activities_slot = st.empty()
+        render_recent_activities(activities_slot)
 
         # Settings section
         st.markdown("""
@@ -288,6 +270,43 @@ def render_sidebar(username, is_manual_search_mode, logout_callback):
         if st.button("Sign out", use_container_width=True):
             logout_callback()
 
+    return activities_slot
+
+def render_recent_activities(placeholder):
+    """
+    Render the recent activities list into a sidebar placeholder
+    
+    Args:
+        placeholder: st.empty() slot; re-rendering replaces its previous content
+    """
+    activities = get_recent_activities()
+    with placeholder.container():
+        if activities:
+            # Render up to 6 most recent items
+            now = datetime.now()
+            for act in islice(activities, 6):
+                icon = act.get('icon', '📋')
+                title = act.get('title', 'Activity')
+                summary = act.get('summary', '')
+                when = format_activity_time(act, now)
+                st.markdown(
+                    f"""
+                    <div style="background: rgba(255, 255, 255, 0.8); border: 1px solid rgba(155, 109, 214, 0.15); padding: 0.75rem 1rem; border-radius: 12px; margin: 0.5rem 1rem; box-shadow: 0 2px 8px rgba(155, 109, 214, 0.08);">
+                      <div style="display: flex; align-items: center; gap: 8px; margin-bottom: 4px;">
+                        <span>{icon}</span>
+                        <div style="font-weight: 600; color: #2d333a; font-size: 13px;">{title}</div>
+                        <div style="margin-left: auto; color: #6e7681; font-size: 12px;">{when}</div>
+                      </div>
+                      <div style="font-size: 12px; color: #6e7681; line-height: 1.4;">{summary}</div>
+                    </div>
+                    """,
+                    unsafe_allow_html=True,
+                )
+        else:
+            st.markdown("""
+                <div style="color: #6e7681; font-size: 12px; margin: 0 1rem 0.5rem 1rem;">No activities yet</div>
+            """, unsafe_allow_html=True)
+
 def render_chat_message(message, message_type="user"):
     """
     Render a single chat message in WhatsApp-like style